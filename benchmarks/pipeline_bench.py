@@ -0,0 +1,321 @@
+"""
+Offline benchmark for the translation stages.
+
+Runs in-process on a fixed corpus: the sentences from test_translation.py
+plus long and bulk inputs generated from a fixed seed. Each stage is
+measured on its own (tokenizer, parser, generator, the whole rule-based
+pipeline and the NMT translator), reporting throughput, p50/p95/p99
+latency per call and peak memory. Results can be saved as JSON and
+compared against an earlier run to catch regressions.
+
+--stub-model replaces the NMT model with a stand-in that echoes its input
+after a fixed delay, for machines without the model weights or torch. Stub numbers
+only say how much the code around the model costs.
+
+Usage:
+    python benchmarks/pipeline_bench.py [--repeat 3] [--stub-model] [--output results.json]
+    python benchmarks/pipeline_bench.py --compare results.json
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+
+# The benchmark measures the stages themselves: no cached results, and no
+# corrections from this install's error reports in the phrase table
+config.CACHE_MAX_ENTRIES = 0
+config.CACHE_PATH = ""
+config.PHRASE_CORRECTIONS = False
+
+from compiler.nmt_translator import NMTTranslator
+from compiler.pipeline import TranslationPipeline
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+# The test cases of test_translation.py, from simple to more complex
+TEST_SENTENCES = [
+    "I am happy",
+    "The cat is on the table",
+    "He loves his new blue car",
+    "I need to speak Spanish fluently",
+    "The teacher wants to go to the city",
+    "The small dog runs in the park",
+    "Yesterday I went to the store and bought some food",
+    "I will visit Spain next summer to practice my Spanish",
+    "Can you help me translate this document from English to Spanish?",
+    "The weather is beautiful today, I think I will go for a walk"
+]
+
+# Change in p50 latency or throughput beyond which --compare reports a regression
+REGRESSION_THRESHOLD = 0.10
+
+class StubTranslator(NMTTranslator):
+    """
+    Stands in for the NMT model without loading any weights
+
+    Each batch sleeps for a fixed cost plus a cost per input word, roughly
+    the shape of a CPU generate call, and echoes its input.
+    """
+
+    BATCH_MS = 5.0
+    WORD_MS = 0.5
+
+    def _load_model(self):
+        self.status = "loaded"
+
+    def translate_batch(self, texts):
+        words = sum(len(text.split()) for text in texts)
+        time.sleep((self.BATCH_MS + self.WORD_MS * words) / 1000)
+        return [{"success": True, "translation": text, "model": "nmt"} for text in texts]
+
+def make_corpus(words, bulk, long, seed=0):
+    """
+    Build the benchmark corpus
+
+    Args:
+        words (list): Vocabulary for the generated sentences
+        bulk (int): Number of short generated sentences
+        long (int): Number of generated multi-sentence paragraphs
+        seed (int): Random seed; the same seed always gives the same corpus
+
+    Returns:
+        dict: Corpus name -> list of texts
+    """
+    rng = random.Random(seed)
+    extras = ["Parthik", "xylophone", "42", "3rd", "quarks", "gluons"]
+
+    def sentence(low, high):
+        length = rng.randint(low, high)
+        tokens = [rng.choice(words) if rng.random() < 0.85 else rng.choice(extras) for _ in range(length)]
+        return " ".join(tokens).capitalize() + rng.choice([".", "?", "!"])
+
+    return {
+        "sentences": list(TEST_SENTENCES),
+        "bulk": [sentence(3, 12) for _ in range(bulk)],
+        "long": [" ".join(sentence(6, 20) for _ in range(rng.randint(8, 20))) for _ in range(long)]
+    }
+
+def measure(run, inputs, repeat):
+    """
+    Time run() on every input
+
+    Args:
+        run (callable): Called with one input at a time
+        inputs (list): Inputs for one pass
+        repeat (int): Number of timed passes, after one untimed warm-up pass
+
+    Returns:
+        dict: Calls per second of the fastest pass and latency percentiles
+        over every call, in milliseconds
+    """
+    for item in inputs:
+        run(item)
+
+    latencies = []
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for item in inputs:
+            call_start = time.perf_counter()
+            run(item)
+            latencies.append(time.perf_counter() - call_start)
+        best = min(best, time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        "calls": len(inputs),
+        "calls_per_s": len(inputs) / best,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000
+    }
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of a sorted list"""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+def peak_memory_kb(run, inputs):
+    """
+    Peak Python memory allocated while running one pass, in KB
+
+    Memory allocated by native libraries (such as torch tensors) is not seen
+    by tracemalloc; max_rss_mb in the run metadata covers it.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for item in inputs:
+            run(item)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    # KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(args):
+    pipeline = TranslationPipeline()
+    engine = pipeline.engines.default
+    if args.stub_model:
+        engine.nmt = engine.batcher.translator = StubTranslator()
+
+    bundle = engine.lexicons.current
+    tokenizer, parser, generator = bundle.tokenizer, pipeline.parser, bundle.generator
+
+    with open(Path(__file__).parent.parent / "data" / "english_tokens.json", "r") as f:
+        words = sorted({word for category in json.load(f).values() for word in category})
+    corpus = make_corpus(words, args.bulk, args.long, args.seed)
+
+    # Tokenizer, parser and generator work on single sentences; the long
+    # paragraphs are split the way the pipeline splits them
+    sentences = corpus["sentences"] + corpus["bulk"] + [
+        text[start:end] for text in corpus["long"] for start, end in pipeline.segmenter.segment(text)
+    ]
+    tokenized = [tokenizer.tokenize_ir(text) for text in sentences]
+    parsed = [parser.annotate(tokenizer.tokenize_ir(text), phrases=False) for text in sentences]
+    token_count = sum(len(sentence.values) for sentence in tokenized)
+
+    nmt_texts = (corpus["sentences"] + corpus["bulk"])[:args.nmt_texts]
+    nmt_batches = [
+        nmt_texts[i:i + config.NMT_BATCH_SIZE] for i in range(0, len(nmt_texts), config.NMT_BATCH_SIZE)
+    ]
+
+    load_start = time.perf_counter()
+    pipeline.preload()
+    model_load_s = time.perf_counter() - load_start
+
+    stages = {
+        "tokenizer": (tokenizer.tokenize_ir, sentences, token_count),
+        "parser": (lambda sentence: parser.annotate(sentence, phrases=False), tokenized, token_count),
+        "parser_phrases": (parser.annotate, tokenized, token_count),
+        "generator": (generator.generate, parsed, token_count),
+        "rule_pipeline": (pipeline.translate_rule_based, corpus["sentences"] + corpus["bulk"] + corpus["long"], None),
+        "nmt": (engine.nmt.translate, nmt_texts, None),
+        "nmt_batch": (engine.nmt.translate_batch, nmt_batches, None)
+    }
+
+    results = {}
+    for name, (run, inputs, tokens) in stages.items():
+        if name.startswith("nmt") and engine.nmt.status != "loaded":
+            print(f"{name:16}skipped: the NMT model is not available (try --stub-model)")
+            continue
+
+        stats = measure(run, inputs, args.repeat if not name.startswith("nmt") else args.nmt_repeat)
+        if tokens is not None:
+            stats["tokens_per_s"] = tokens * stats["calls_per_s"] / stats["calls"]
+        stats["peak_kb"] = peak_memory_kb(run, inputs)
+        results[name] = stats
+
+        print(f"{name:16}{stats['calls_per_s']:>12,.0f}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}"
+              f"{stats['p99_ms']:>10.3f}{stats['peak_kb']:>10,.0f}")
+
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "model": "stub" if args.stub_model else engine.nmt.model_name,
+            "model_load_s": model_load_s,
+            "lexicon_format": bundle.describe()["lexicon_format"],
+            "corpus": {name: len(texts) for name, texts in corpus.items()},
+            "corpus_sha1": hashlib.sha1(json.dumps(corpus).encode("utf-8")).hexdigest()[:12],
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "max_rss_mb": max_rss_mb()
+        },
+        "stages": results
+    }
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Print the change of every stage against an earlier run
+
+    Returns:
+        list: Names of the stages that got slower by more than threshold
+    """
+    if current["meta"]["corpus_sha1"] != baseline["meta"]["corpus_sha1"]:
+        print("\nWarning: the runs used different corpora; the numbers are not comparable")
+
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta']['date']}):")
+    regressions = []
+    for name, stats in current["stages"].items():
+        before = baseline["stages"].get(name)
+        if before is None:
+            continue
+
+        throughput = stats["calls_per_s"] / before["calls_per_s"] - 1
+        p50 = stats["p50_ms"] / before["p50_ms"] - 1
+        p99 = stats["p99_ms"] / before["p99_ms"] - 1
+        slower = throughput < -threshold or p50 > threshold
+        if slower:
+            regressions.append(name)
+
+        print(f"{'*' if slower else ' '} {name:16}throughput {throughput:>+7.1%}   p50 {p50:>+7.1%}   p99 {p99:>+7.1%}")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the translation stages on a fixed corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per rule-based stage")
+    parser.add_argument("--nmt-repeat", type=int, default=1, help="Timed passes per NMT stage")
+    parser.add_argument("--bulk", type=int, default=2000, help="Short generated sentences")
+    parser.add_argument("--long", type=int, default=50, help="Generated multi-sentence paragraphs")
+    parser.add_argument("--nmt-texts", type=int, default=50, help="Texts translated by the NMT stages")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated corpus")
+    parser.add_argument("--stub-model", action="store_true", help="Replace the NMT model with a fixed-delay stand-in")
+    parser.add_argument("--output", type=Path, help="Save the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="Compare against results saved by an earlier run")
+    args = parser.parse_args()
+
+    print(f"{'stage':16}{'calls/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KB':>10}")
+    results = run_benchmarks(args)
+    print(f"\nModel load: {results['meta']['model_load_s']:.2f} s; max RSS: {results['meta']['max_rss_mb'] or 0:.0f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline)
+        if regressions:
+            print(f"\nSlower than the baseline by more than {REGRESSION_THRESHOLD:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
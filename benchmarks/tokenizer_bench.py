@@ -0,0 +1,113 @@
+"""
+Microbenchmark for the tokenizer.
+
+Compares the original tokenizer loop (one dict probe per category, a dict per
+token) against the current API on the same generated corpus and prints
+tokens per second for each.
+
+Usage:
+    python benchmarks/tokenizer_bench.py [--sentences 2000] [--repeat 5]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from compiler.lexicon import CATEGORIES, Lexicon
+from compiler.tokenizer import Tokenizer
+
+def make_corpus(lexicon, sentences, seed=0):
+    """Generate sentences mixing known words, unknown words, numbers and punctuation"""
+    rng = random.Random(seed)
+    words = list(lexicon.entries)
+    extras = ["Parthik", "xylophone", "42", "3rd", "hello", "world"]
+
+    corpus = []
+    for _ in range(sentences):
+        length = rng.randint(3, 20)
+        sentence = [rng.choice(words) if rng.random() < 0.8 else rng.choice(extras) for _ in range(length)]
+        corpus.append(" ".join(sentence).capitalize() + rng.choice([".", "?", "!", ""]))
+    return corpus
+
+def legacy_tokenizer(lexicon):
+    """The tokenizer loop as it was before the single-probe fast path"""
+    categories = {category: {} for category, _ in CATEGORIES}
+    for word, (token_type, _) in lexicon.entries.items():
+        for category, category_type in CATEGORIES:
+            if category_type == token_type:
+                categories[category][word] = word
+
+    def tokenize(input_text):
+        cleaned_text = input_text.lower().strip()
+        raw_tokens = re.findall(r'\b\w+\b|\S', cleaned_text)
+
+        tokens = []
+        for token in raw_tokens:
+            if token in categories.get("pronouns", {}):
+                token_type = "PRONOUN"
+            elif token in categories.get("verbs", {}):
+                token_type = "VERB"
+            elif token in categories.get("articles", {}):
+                token_type = "ARTICLE"
+            elif token in categories.get("nouns", {}):
+                token_type = "NOUN"
+            elif token in categories.get("adjectives", {}):
+                token_type = "ADJECTIVE"
+            elif token in categories.get("prepositions", {}):
+                token_type = "PREPOSITION"
+            elif token in ".,;:?!":
+                token_type = "PUNCTUATION"
+            elif token.isalpha():
+                token_type = "NOUN"
+            else:
+                token_type = "UNKNOWN"
+            tokens.append({"value": token, "type": token_type})
+        return tokens
+
+    return tokenize
+
+def measure(name, run, corpus, token_count, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(corpus)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:34}{token_count / best:>14,.0f} tokens/s{best * 1000:>10.1f} ms")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tokenizer")
+    parser.add_argument("--sentences", type=int, default=2000, help="Sentences in the generated corpus")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per variant; the best one is reported")
+    args = parser.parse_args()
+
+    lexicon = Lexicon.load()
+    tokenizer = Tokenizer(lexicon)
+    legacy = legacy_tokenizer(lexicon)
+    corpus = make_corpus(lexicon, args.sentences)
+
+    # Both implementations must agree before their speed means anything
+    for text in corpus:
+        assert legacy(text) == tokenizer.tokenize(text), text
+
+    token_count = sum(len(tokenizer.tokens(text)) for text in corpus)
+    print(f"Corpus: {len(corpus)} sentences, {token_count} tokens\n")
+
+    baseline = measure("legacy tokenize (dicts)", lambda c: [legacy(t) for t in c], corpus, token_count, args.repeat)
+    results = [
+        ("tokenize (dicts)", lambda c: [tokenizer.tokenize(t) for t in c]),
+        ("tokens (Token records)", lambda c: [tokenizer.tokens(t) for t in c]),
+        ("tokenize_many (Token records)", tokenizer.tokenize_many),
+        ("iter_tokens (streaming)", lambda c: [list(tokenizer.iter_tokens(t)) for t in c]),
+    ]
+    for name, run in results:
+        best = measure(name, run, corpus, token_count, args.repeat)
+        print(f"{'':34}{baseline / best:>14.2f}x legacy")
+
+if __name__ == "__main__":
+    main()
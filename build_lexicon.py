@@ -0,0 +1,51 @@
+"""
+Compile the token dictionaries into the binary lexicon used by the server.
+
+Reads data/english_tokens.json and data/spanish_tokens.json (which stay the
+files to edit) and writes data/lexicon.bin. The server memory-maps it at
+startup instead of parsing the JSON, and falls back to the JSON when the
+compiled file is missing or older than the token files. A running server
+picks up a rebuilt file on its next lexicon reload.
+
+Usage:
+    python build_lexicon.py [--data-dir data] [--output data/lexicon.bin]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from compiler.lexicon import BINARY_FILE, DATA_DIR, Lexicon, MappedLexicon, source_digest
+
+def build(data_dir, output):
+    started = time.perf_counter()
+    english_raw = (data_dir / "english_tokens.json").read_bytes()
+    spanish_raw = (data_dir / "spanish_tokens.json").read_bytes()
+
+    lexicon = Lexicon(json.loads(english_raw), json.loads(spanish_raw))
+    lexicon.write_binary(output, source_digest(english_raw, spanish_raw))
+    built = time.perf_counter() - started
+
+    # Read every word back before declaring success
+    started = time.perf_counter()
+    mapped = MappedLexicon(output)
+    opened = time.perf_counter() - started
+
+    mismatches = [word for word, entry in lexicon.entries.items() if mapped.lookup(word) != entry]
+    if len(mapped) != len(lexicon) or mapped.secondary != lexicon.secondary or mismatches:
+        raise SystemExit(f"Compiled lexicon does not match the token files (e.g. {mismatches[:5]})")
+
+    print(f"Wrote {output}: {len(mapped)} entries, {output.stat().st_size / 1024:.0f} KB")
+    print(f"Compiled in {built * 1000:.0f} ms; opens in {opened * 1000:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the token dictionaries into data/lexicon.bin")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="Directory holding the token files")
+    parser.add_argument("--output", type=Path, help="Output file (default: <data-dir>/lexicon.bin)")
+    args = parser.parse_args()
+
+    build(args.data_dir, args.output or args.data_dir / BINARY_FILE)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import asyncio
+import contextvars
+import math
+import time
+
+import config
+from compiler.executor import BoundedExecutor, Overloaded
+from compiler.metrics import METRICS, Histogram
+
+# Upper bounds of the batch size histogram
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+class NMTBatcher:
+    def __init__(self, translator, max_batch_size=None, max_wait_ms=None, max_queue=None):
+        """
+        Collect concurrent NMT requests into micro-batches
+
+        Requests are queued until either max_batch_size items are waiting or
+        the first one has waited max_wait_ms. The batch is then translated
+        with one generate call in the model's own thread, so the event loop
+        stays free while the model runs.
+
+        Args:
+            translator (NMTTranslator): The translator that runs the model
+            max_batch_size (int): Largest number of texts per generate call
+            max_wait_ms (float): Longest time a request waits for a batch to fill
+            max_queue (int): Texts allowed to wait for a batch (0 for no limit)
+        """
+        self.translator = translator
+        self.max_batch_size = max_batch_size or config.NMT_BATCH_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else config.NMT_BATCH_WAIT_MS) / 1000
+        self.max_queue = max_queue if max_queue is not None else config.NMT_MAX_QUEUE
+
+        # One batch runs at a time; the queue above is what bounds the waiting
+        self.executor = BoundedExecutor("nmt", workers=1, max_queue=0)
+
+        # Created on first use so they bind to the running event loop
+        self._queue = None
+        self._worker = None
+
+        # Only touched on the event loop
+        self.batches = 0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.rejected = 0
+        # Moving average of the time a batch takes, for Retry-After estimates
+        self.batch_seconds = None
+
+    async def translate(self, text, wait=False):
+        """
+        Queue a text for translation and wait for its result
+
+        Args:
+            text (str): The text to translate
+            wait (bool): Wait for room when the queue is full instead of
+                raising Overloaded
+
+        Returns:
+            dict: The same result shape as NMTTranslator.translate
+
+        Raises:
+            Overloaded: If the queue is full and wait is False
+        """
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(self.max_queue)
+            # A fresh context, so the worker never records into the timings
+            # of the request that happened to start it
+            self._worker = asyncio.create_task(self._run(), context=contextvars.Context())
+
+        future = asyncio.get_running_loop().create_future()
+        item = (text, future, time.perf_counter())
+        if wait:
+            await self._queue.put(item)
+        else:
+            try:
+                self._queue.put_nowait(item)
+            except asyncio.QueueFull:
+                self.rejected += 1
+                raise Overloaded("The NMT queue is full", retry_after=self.retry_after())
+
+        result, queued, inference = await future
+
+        # This request's share of the batch, for its own timings
+        METRICS.note("queue", queued)
+        METRICS.note("inference", inference)
+        return result
+
+    def queue_depth(self):
+        """Return the number of texts waiting for a batch"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def full(self):
+        """Check whether a new text would be turned away"""
+        return self._queue is not None and self._queue.full()
+
+    def retry_after(self):
+        """Estimate the seconds until the texts waiting now have been translated"""
+        batches = self.queue_depth() / self.max_batch_size + 1
+        return max(1, math.ceil(batches * (self.batch_seconds or 1.0)))
+
+    async def close(self):
+        """Stop the batching worker"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self.executor.shutdown()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            # Keep collecting until the batch is full or the wait is over
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Callers that gave up while queued don't need a translation
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                METRICS.observe("queue", started - enqueued, engine="nmt")
+            self.batches += 1
+            self.batch_sizes.observe(len(batch))
+
+            texts = [text for text, _, _ in batch]
+            try:
+                results = await self.executor.run(self.translator.translate_batch, texts, admit=False)
+            except Exception as e:
+                results = [{
+                    "success": False,
+                    "error": f"NMT translation failed: {str(e)}",
+                    "model": "nmt"
+                }] * len(batch)
+
+            inference = time.perf_counter() - started
+            self.batch_seconds = inference if self.batch_seconds is None else 0.8 * self.batch_seconds + 0.2 * inference
+            for (_, future, enqueued), result in zip(batch, results):
+                if not future.done():
+                    future.set_result((result, started - enqueued, inference))
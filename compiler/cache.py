@@ -0,0 +1,332 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class TranslationCache:
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, ttl_seconds=None, path=None):
+        """
+        Bounded LRU cache for translation results
+
+        Entries are evicted least-recently-used first once either the entry
+        or the byte budget is exceeded. An optional SQLite file acts as a
+        second tier that survives restarts, so a new worker starts warm.
+
+        The event loop never waits on the SQLite file: get() and put() only
+        touch memory, new entries are written in batches by flush(), and
+        fetch() and load() read the file in a worker thread. The file keeps
+        at most max_entries entries and drops them after the TTL too.
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory (0 disables the cache)
+            max_bytes (int): Maximum total size of the cached values, in bytes of JSON
+            ttl_seconds (float): How long an entry stays valid, or None to keep it until evicted
+            path (str): SQLite file for the persistent tier, or None for memory only
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds or None
+
+        # key -> (value, size in bytes, expiry time or None)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        # The SQLite connection is opened on first use in each process, since
+        # a connection must not be shared with workers forked after startup
+        self.path = path if max_entries else None
+        self._db = None
+        self._db_pid = None
+        # Guards the connection; taken before _lock when both are needed
+        self._db_lock = threading.Lock()
+
+        # Entries not yet written to the persistent tier: key -> (JSON, creation time)
+        self._pending = OrderedDict()
+
+    # Part of every key; bump it when the shape of cached results or the
+    # rule-based output changes, so a persistent tier written by an older
+    # version is not read back
+    FORMAT_VERSION = 5
+
+    @classmethod
+    def key(cls, engine, model_name, normalized_text):
+        """Build a cache key from the engine, its model and the normalized input"""
+        return f"{cls.FORMAT_VERSION}\x1f{engine}\x1f{model_name or ''}\x1f{normalized_text}"
+
+    def get(self, key):
+        """
+        Return the value cached in memory for key, or None on a miss
+
+        The persistent tier is not read, so this is safe on the event loop;
+        see fetch(). Returned values are shared between callers and must
+        not be mutated.
+        """
+        if not self.max_entries:
+            return None
+
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    async def fetch(self, key):
+        """Like get(), but fall back to the persistent tier, read in a worker thread"""
+        if not self.max_entries:
+            return None
+
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None or not self.path:
+                if value is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                return value
+
+        loaded = await asyncio.to_thread(self._load, key)
+        with self._lock:
+            if loaded is None:
+                self.misses += 1
+                return None
+
+            value, size, remaining = loaded
+            self.hits += 1
+            self._insert(key, value, size, time.monotonic() + remaining if remaining is not None else None)
+            return value
+
+    def put(self, key, value):
+        """Cache a JSON-serializable value under key; the persistent tier gets it on the next flush()"""
+        if not self.max_entries:
+            return
+
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._insert(key, value, len(encoded), time.monotonic() + self.ttl if self.ttl else None)
+
+            if self.path:
+                self._pending.pop(key, None)
+                self._pending[key] = (encoded, time.time())
+                # Nothing beyond the entry budget would survive the flush anyway
+                if len(self._pending) > self.max_entries:
+                    self._pending.popitem(last=False)
+
+    def flush(self):
+        """
+        Write pending entries to the persistent tier and trim it to the budget
+
+        Drops expired entries and then the oldest ones beyond max_entries.
+        Blocks on the SQLite file, so call it from a worker thread.
+
+        Returns:
+            int: The number of entries written
+        """
+        if not self.path:
+            return 0
+
+        with self._db_lock:
+            with self._lock:
+                pending = [(key, encoded, created) for key, (encoded, created) in self._pending.items()]
+                self._pending.clear()
+
+            try:
+                db = self._connection()
+                db.execute("BEGIN")
+                try:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO translations (key, value, created) VALUES (?, ?, ?)", pending
+                    )
+                    if self.ttl:
+                        db.execute("DELETE FROM translations WHERE created <= ?", (time.time() - self.ttl,))
+                    db.execute(
+                        "DELETE FROM translations WHERE key IN "
+                        "(SELECT key FROM translations ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                # The entries are still cached in memory
+                print(f"Error writing the persistent translation cache: {str(e)}")
+                return 0
+
+        return len(pending)
+
+    def load(self):
+        """
+        Fill the memory tier from the persistent tier, newest entries first
+
+        Blocks on the SQLite file, so call it from a worker thread.
+
+        Returns:
+            int: The number of entries loaded
+        """
+        if not self.path:
+            return 0
+
+        now = time.time()
+        with self._db_lock:
+            rows = self._connection().execute(
+                "SELECT key, value, created FROM translations WHERE created > ? ORDER BY created DESC LIMIT ?",
+                (now - self.ttl if self.ttl else 0, self.max_entries)
+            ).fetchall()
+
+        monotonic = time.monotonic()
+        with self._lock:
+            # Oldest first, so the newest end up most recently used
+            for key, encoded, created in reversed(rows):
+                if key not in self._entries:
+                    expires = monotonic + created + self.ttl - now if self.ttl else None
+                    self._insert(key, json.loads(encoded), len(encoded), expires)
+        return len(rows)
+
+    def invalidate(self, engine, model_name):
+        """
+        Drop every entry cached for an engine and model, e.g. an old lexicon version
+
+        Also deletes them from the persistent tier, so call it from a worker thread.
+
+        Returns:
+            int: The number of entries dropped from memory
+        """
+        prefix = self.key(engine, model_name, "")
+        # Keys with the prefix sort between it and the same string with the
+        # final separator incremented
+        end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+        with self._lock:
+            stale = [key for key in self._entries if key.startswith(prefix)]
+            for key in stale:
+                self._remove(key)
+            for key in [key for key in self._pending if key.startswith(prefix)]:
+                del self._pending[key]
+
+        if self.path:
+            with self._db_lock:
+                self._connection().execute(
+                    "DELETE FROM translations WHERE key >= ? AND key < ?", (prefix, end)
+                )
+
+        return len(stale)
+
+    def clear(self):
+        """Drop every entry from memory and from the persistent tier"""
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            self._bytes = 0
+
+        if self.path:
+            with self._db_lock:
+                self._connection().execute("DELETE FROM translations")
+
+    def stats(self):
+        """Return the cache counters and current size"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+    def close(self):
+        """Write pending entries and close the persistent tier"""
+        self.flush()
+        with self._db_lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+    def _connection(self):
+        # Must be called with _db_lock held
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            # Expiry and trimming to the budget go by age
+            self._db.execute("CREATE INDEX IF NOT EXISTS translations_created ON translations (created)")
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _insert(self, key, value, size, expires):
+        # Must be called with the lock held
+        if key in self._entries:
+            self._remove(key)
+
+        # Values larger than the whole budget are not worth caching
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (value, size, expires)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _lookup(self, key):
+        # Must be called with the lock held
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, size, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _remove(self, key):
+        # Must be called with the lock held
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _load(self, key):
+        """
+        Read a value from the persistent tier, honouring the TTL
+
+        Returns:
+            tuple: (value, size in bytes, seconds left to live or None), or None on a miss
+        """
+        if not self.path:
+            return None
+
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT value, created FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        encoded, created = row
+        remaining = None
+        if self.ttl:
+            remaining = created + self.ttl - time.time()
+            if remaining <= 0:
+                return None
+
+        return json.loads(encoded), len(encoded), remaining
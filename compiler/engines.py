@@ -0,0 +1,246 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from compiler.batcher import NMTBatcher
+from compiler.lexicon_manager import LexiconManager
+from compiler.nmt_translator import NMTTranslator
+
+class UnsupportedPair(ValueError):
+    """Raised for a language pair the server is not configured for"""
+
+class Engine:
+    def __init__(self, name, model_name, data_dir=None, corrections=None, validation_texts=(), nmt_options=None):
+        """
+        The translators of one language pair
+
+        Args:
+            name (str): The pair as "source-target", e.g. "en-es"
+            model_name (str): Hugging Face name of the pair's Marian model
+            data_dir (Path): Directory holding the pair's lexicon files, or
+                None for a pair translated by its model alone
+            corrections (callable): See LexiconManager
+            validation_texts (list): See LexiconManager
+            nmt_options (dict): Keyword arguments for NMTTranslator
+        """
+        self.name = name
+        self.source, self.target = name.split("-", 1)
+        self.lexicons = None
+        if data_dir is not None:
+            self.lexicons = LexiconManager(data_dir, corrections=corrections, validation_texts=validation_texts)
+        self.nmt = NMTTranslator(model_name=model_name, **(nmt_options or {}))
+        self.batcher = NMTBatcher(self.nmt)
+        self.last_used = time.monotonic()
+
+    def busy(self):
+        """Check whether the pair's model has texts waiting or running"""
+        return self.batcher.queue_depth() > 0 or self.batcher.executor.pending > 0
+
+    def status(self):
+        return {
+            "model": self.nmt.model_name,
+            "nmt": self.nmt.status,
+            "lexicon": self.lexicons.current.version if self.lexicons is not None else None
+        }
+
+class EngineRegistry:
+    def __init__(self, path, max_models=2, idle_seconds=0, corrections=None, validation_texts=(), nmt_options=None):
+        """
+        The translators of every configured language pair, built on first use
+
+        Pairs are listed in a JSON file with the Marian model of each and,
+        for pairs the rule engine can translate, a directory holding the
+        same lexicon files as data/. A pair's lexicon and batcher are built
+        the first time it is asked for and kept after that; they are small.
+        Models are what take memory, so at most max_models stay loaded:
+        loading another one unloads the least recently used, and models
+        unused for idle_seconds are unloaded by evict_idle(). The default
+        pair is built at startup and its model is never unloaded.
+
+        Args:
+            path (Path): The language pairs file
+            max_models (int): Most models loaded at once, the default pair's included
+            idle_seconds (float): Unload models unused for this long (0 keeps them)
+            corrections (callable): See LexiconManager; only applied to the
+                default pair, since error reports do not record a pair
+            validation_texts (list): See LexiconManager
+            nmt_options (dict): Keyword arguments for every NMTTranslator
+
+        Raises:
+            ValueError: If the pairs file cannot be read or lacks the default pair
+        """
+        path = Path(path)
+        try:
+            with open(path, "r") as f:
+                pairs = json.load(f)
+            default = pairs["default"].lower()
+            self.pairs = {name.lower(): (pair["model"], pair.get("lexicon")) for name, pair in pairs["pairs"].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Could not read the language pairs from {path}: {str(e)}")
+
+        if default not in self.pairs:
+            raise ValueError(f"The default language pair {default} is not in {path}")
+
+        self.data_dir = path.parent
+        self.max_models = max(1, max_models)
+        self.idle_seconds = idle_seconds
+        self.validation_texts = list(validation_texts)
+        self.nmt_options = dict(nmt_options or {})
+
+        # Least recently used first
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+        self.default = self._build(default, corrections)
+        self._engines[default] = self.default
+
+    def get(self, pair=None):
+        """
+        Return the engine of a pair, building it on first use
+
+        Building reads the pair's lexicon files; the model is only loaded
+        when it first translates.
+
+        Args:
+            pair (str): "source-target", or None for the default pair
+
+        Raises:
+            UnsupportedPair: If the pair is not configured
+            ValueError: If the pair's lexicon cannot be built
+        """
+        engine = self.find(pair)
+        if engine is not None:
+            return engine
+
+        name = pair.lower()
+        with self._lock:
+            # Another thread may have built it while we waited
+            engine = self._engines.get(name)
+            if engine is None:
+                engine = self._engines[name] = self._build(name)
+            return engine
+
+    def resolve(self, source=None, target=None):
+        """
+        Name the pair for a request's source and target languages
+
+        A missing side is filled in from the default pair when that matches
+        the given side, and otherwise from the only configured pair that does.
+
+        Returns:
+            str: The pair as "source-target", or None for the default pair
+
+        Raises:
+            UnsupportedPair: If no configured pair, or more than one, matches
+        """
+        if source is None and target is None:
+            return None
+        if source is not None and target is not None:
+            return f"{source}-{target}"
+
+        side, code = (0, source) if source is not None else (1, target)
+        code = code.lower()
+        if self.default.name.split("-", 1)[side] == code:
+            return self.default.name
+
+        matches = sorted(name for name in self.pairs if name.split("-", 1)[side] == code)
+        if len(matches) == 1:
+            return matches[0]
+
+        given = f"source {code}" if side == 0 else f"target {code}"
+        if not matches:
+            raise UnsupportedPair(f"No language pair has {given}; available: {', '.join(sorted(self.pairs))}")
+        raise UnsupportedPair(f"Several language pairs have {given}, give both source and target: {', '.join(matches)}")
+
+    def find(self, pair=None):
+        """
+        Return the engine of a pair if it was built already, else None
+
+        Raises:
+            UnsupportedPair: If the pair is not configured
+        """
+        if pair is None:
+            return self.default
+
+        name = pair.lower()
+        if name not in self.pairs:
+            raise UnsupportedPair(
+                f"Unsupported language pair {pair}; available: {', '.join(sorted(self.pairs))}"
+            )
+        return self._engines.get(name)
+
+    def all(self):
+        """Return the engines built so far"""
+        with self._lock:
+            return list(self._engines.values())
+
+    def use(self, engine):
+        """
+        Note that a pair's model is about to translate
+
+        If that loads one model too many, the least recently used other
+        models are unloaded. Models with texts waiting or running are left
+        alone, so the limit can be passed for a while under load.
+        """
+        engine.last_used = time.monotonic()
+        with self._lock:
+            self._engines.move_to_end(engine.name)
+            if engine.nmt.status in ("loaded", "loading"):
+                return
+
+            loaded = [other for other in self._engines.values() if other.nmt.status in ("loaded", "loading")]
+            excess = len(loaded) + 1 - self.max_models
+            for other in loaded:
+                if excess <= 0:
+                    break
+                # A model still loading holds its lock; it is left for a later call
+                if other is self.default or other.nmt.status != "loaded" or other.busy():
+                    continue
+                other.nmt.unload()
+                self.evictions += 1
+                excess -= 1
+
+    def evict_idle(self):
+        """
+        Unload the models that have not translated for idle_seconds
+
+        Returns:
+            list: Names of the pairs whose model was unloaded
+        """
+        if not self.idle_seconds:
+            return []
+
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [
+                engine for engine in self._engines.values()
+                if engine is not self.default and engine.nmt.status == "loaded"
+                and engine.last_used < cutoff and not engine.busy()
+            ]
+            for engine in idle:
+                engine.nmt.unload()
+                self.evictions += 1
+        return [engine.name for engine in idle]
+
+    def status(self):
+        """Describe the configured pairs and the state of the ones built so far"""
+        return {
+            "default": self.default.name,
+            "available": sorted(self.pairs),
+            "max_models": self.max_models,
+            "built": {engine.name: engine.status() for engine in self.all()}
+        }
+
+    def _build(self, name, corrections=None):
+        model_name, lexicon = self.pairs[name]
+        return Engine(
+            name,
+            model_name,
+            data_dir=self.data_dir / lexicon if lexicon is not None else None,
+            corrections=corrections,
+            validation_texts=self.validation_texts,
+            nmt_options=self.nmt_options
+        )
@@ -0,0 +1,88 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+class Overloaded(RuntimeError):
+    def __init__(self, message, retry_after=1):
+        """
+        Raised when the server has no room for more work right now
+
+        Args:
+            message (str): What was full
+            retry_after (int): Seconds after which a retry is likely to be accepted
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class BoundedExecutor:
+    def __init__(self, name, workers=2, max_queue=64):
+        """
+        Thread pool with a bounded queue, for blocking work called from the event loop
+
+        Work beyond the running workers waits in the queue; once the queue
+        is full, new work is rejected with Overloaded instead of piling up,
+        so the latency of accepted work stays bounded. Queued work whose
+        caller is cancelled (e.g. by a deadline) never runs.
+
+        Args:
+            name (str): Used in thread names and error messages
+            workers (int): Threads running work at once
+            max_queue (int): Work items allowed to wait for a thread
+        """
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+
+        # Only touched on the event loop
+        self.pending = 0
+        self.rejected = 0
+
+        # Created on first use in each process; threads do not survive a fork
+        self._pool = None
+        self._pool_pid = None
+
+    async def run(self, fn, *args, admit=True):
+        """
+        Run fn(*args) in the pool and return its result
+
+        Args:
+            admit (bool): Reject the call when the queue is full. Callers that
+                already hold a place, such as a batch request working through
+                its items one at a time, pass False.
+
+        Raises:
+            Overloaded: If the queue is full
+        """
+        if admit and self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"The {self.name} queue is full")
+
+        loop = asyncio.get_running_loop()
+        # Carries the caller's context along, as asyncio.to_thread does
+        future = self._executor().submit(contextvars.copy_context().run, fn, *args)
+        self.pending += 1
+        # Counted until the work is really finished or was cancelled before it started
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(self._release)
+            except RuntimeError:
+                # The event loop is already closed
+                pass
+
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    def _executor(self):
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix=self.name)
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def _release(self):
+        self.pending -= 1
@@ -1,132 +1,105 @@
-import json
-from pathlib import Path
+import time
+
+from compiler.grammar import GrammarRules
+from compiler.lexicon import Lexicon
+from compiler.metrics import METRICS
+from compiler.phrases import PhraseTable
 
 class Generator:
-    def __init__(self):
+    def __init__(self, lexicon=None, rules=None, phrases=None):
         """Initialize the code generator (translation engine)"""
-        # Load the English and Spanish token mappings
-        data_dir = Path(__file__).parent.parent / "data"
-        
-        with open(data_dir / "english_tokens.json", "r") as f:
-            self.english_tokens = json.load(f)
-            
-        with open(data_dir / "spanish_tokens.json", "r") as f:
-            self.spanish_tokens = json.load(f)
+        # Share the compiled lexicon with the tokenizer when one is given
+        self.lexicon = lexicon if lexicon is not None else Lexicon.load()
+        # Spanish grammar rules, from data/grammar_rules.json by default
+        self.rules = rules if rules is not None else GrammarRules.load()
+        # Translation memory for multi-word expressions
+        self.phrases = phrases if phrases is not None else PhraseTable.load()
     
-    def generate(self, parse_tree):
+    def generate(self, sentence):
         """
-        Generate Spanish output from the parse tree
+        Generate Spanish output from a parsed sentence
         
         Args:
-            parse_tree (dict): The parse tree from the parser
+            sentence (SentenceIR): The sentence, annotated by the parser
             
         Returns:
             dict: The translation result or error
         """
-        # Check if the parse tree is valid
-        if not parse_tree.get("is_valid", False):
+        started = time.perf_counter()
+        try:
+            return self._generate(sentence)
+        finally:
+            METRICS.observe("generate", time.perf_counter() - started)
+
+    def _generate(self, sentence):
+        """Translate a parsed sentence; see generate()"""
+        # Check if the parse is valid
+        if not sentence.is_valid:
             return {
                 "success": False,
-                "error": parse_tree.get("message", "Invalid parse tree"),
+                "error": sentence.message or "Invalid parse tree",
                 "translation": None
             }
         
-        # Extract the tokens
-        tokens = parse_tree.get("tokens", [])
-        pattern = parse_tree.get("pattern", [])
-        
-        # First pass: Translate tokens individually
-        translated_tokens = []
-        for token in tokens:
-            token_value = token["value"]
-            token_type = token["type"]
-            
-            # Translate based on token type
-            if token_type == "PRONOUN":
-                translated_value = self.spanish_tokens.get("pronouns", {}).get(token_value, token_value)
-            elif token_type == "VERB":
-                translated_value = self.spanish_tokens.get("verbs", {}).get(token_value, token_value)
-            elif token_type == "ARTICLE":
-                translated_value = self.spanish_tokens.get("articles", {}).get(token_value, token_value)
-            elif token_type == "NOUN":
-                translated_value = self.spanish_tokens.get("nouns", {}).get(token_value, token_value)
-            elif token_type == "ADJECTIVE":
-                translated_value = self.spanish_tokens.get("adjectives", {}).get(token_value, token_value)
-            elif token_type == "PREPOSITION":
-                translated_value = self.spanish_tokens.get("prepositions", {}).get(token_value, token_value)
-            elif token_type == "PUNCTUATION":
-                translated_value = token_value  # Punctuation remains the same
-            else:
-                translated_value = token_value  # Unknown tokens stay as is
-            
-            translated_tokens.append({
-                "original": token_value,
-                "translated": translated_value,
-                "type": token_type
-            })
+        values = sentence.values
+        types = sentence.types
         
-        # Second pass: Apply Spanish grammar rules
-        self._apply_grammar_rules(translated_tokens, pattern)
+        # Known phrases are translated as a whole; only the words between
+        # them are translated one by one and go through the grammar rules.
+        # A phrase's translation is output in place of its first token.
+        translated = [None] * len(values)
+        order = []
+        position = 0
+        for start, end, phrase in self.phrases.matches(values):
+            order += self._translate_words(values, types, translated, position, start)
+            translated[start] = phrase
+            order.append(start)
+            position = end
+        order += self._translate_words(values, types, translated, position, len(values))
         
         # Combine tokens to form Spanish sentence
-        translated_text = ""
-        for i, token in enumerate(translated_tokens):
+        parts = []
+        previous_type = None
+        for i in order:
+            token_type = types[i]
             # In Spanish, we typically don't add spaces before punctuation
-            if token["type"] == "PUNCTUATION":
-                translated_text += token["translated"]
+            if token_type == "PUNCTUATION":
+                parts.append(translated[i])
             # Add appropriate spacing between words
-            elif i > 0 and translated_tokens[i-1]["type"] != "PUNCTUATION":
-                translated_text += " " + token["translated"]
+            elif previous_type is not None and previous_type != "PUNCTUATION":
+                parts.append(" " + translated[i])
             else:
-                translated_text += token["translated"]
+                parts.append(translated[i])
+            previous_type = token_type
                 
         return {
             "success": True,
-            "translation": translated_text.strip(),
-            "tokens": translated_tokens
+            "translation": "".join(parts).strip()
         }
     
-    def _apply_grammar_rules(self, translated_tokens, pattern):
+    def _translate_words(self, values, types, translated, start, end):
         """
-        Apply Spanish grammar rules to the translated tokens
+        Translate the tokens in [start, end) word by word
         
         Args:
-            translated_tokens (list): The translated tokens
-            pattern (list): The sentence pattern recognized by the parser
+            values (list): The sentence's token values
+            types (list): The sentence's token types
+            translated (list): Per-token translations, filled in for this range
+            start (int): First token to translate
+            end (int): Token after the last one to translate
+            
+        Returns:
+            list: The token indexes of the range, in output order
         """
-        # Rule 1: In Spanish, adjectives usually follow the noun they modify
-        for i in range(len(translated_tokens) - 1):
-            if (i + 1 < len(translated_tokens) and 
-                translated_tokens[i]["type"] == "ADJECTIVE" and 
-                translated_tokens[i + 1]["type"] == "NOUN"):
-                
-                # Swap adjective and noun
-                translated_tokens[i], translated_tokens[i + 1] = translated_tokens[i + 1], translated_tokens[i]
+        if start == end:
+            return []
         
-        # Rule 2: Handle subject pronoun omission - Spanish often omits subject pronouns
-        # In patterns like "PRONOUN VERB ..." we can sometimes omit the pronoun
-        if (len(translated_tokens) >= 2 and 
-            translated_tokens[0]["type"] == "PRONOUN" and 
-            translated_tokens[1]["type"] == "VERB"):
-            
-            # For some cases, we can omit the pronoun as it's implied by the verb conjugation
-            if translated_tokens[0]["original"] in ["i", "you", "he", "she", "we", "they"]:
-                # Mark for removal by setting to empty string
-                # We won't actually remove it to maintain token alignment
-                translated_tokens[0]["translated"] = ""
+        # First pass: Translate tokens individually
+        # Punctuation and unknown tokens stay as is
+        translated[start:end] = map(self.lexicon.translate, values[start:end], types[start:end])
         
-        # Rule 3: Article-noun agreement - Spanish articles must agree with the noun's gender
-        # This is a simplified implementation that assumes nouns ending in 'a' are feminine
-        for i in range(len(translated_tokens) - 1):
-            if (translated_tokens[i]["type"] == "ARTICLE" and 
-                translated_tokens[i+1]["type"] == "NOUN"):
-                
-                article = translated_tokens[i]["translated"]
-                noun = translated_tokens[i+1]["translated"]
-                
-                # Very basic gender check - assumes nouns ending in 'a' are feminine
-                # This is a simplification and not linguistically accurate for all cases
-                if article == "un" and noun.endswith("a"):
-                    translated_tokens[i]["translated"] = "una"
-                elif article == "el" and noun.endswith("a"):
-                    translated_tokens[i]["translated"] = "la" 
\ No newline at end of file
+        # Second pass: Apply Spanish grammar rules. Reordering is done on a
+        # list of token indexes, so the sentence itself is left untouched.
+        order = list(range(start, end))
+        self.rules.apply(values, types, order, translated, at_start=start == 0)
+        return order
@@ -0,0 +1,173 @@
+import json
+from pathlib import Path
+
+from compiler.lexicon import DATA_DIR
+
+# Tests a rule can make on a matched token, as written in grammar_rules.json
+CONDITIONS = ("value_in", "value_endswith", "translation_in", "translation_endswith")
+
+class GrammarRule:
+    __slots__ = ("index", "name", "pattern", "at_start", "conditions", "reorder", "drop", "replace")
+
+    def __init__(self, index, spec):
+        """
+        Compile one rule from its grammar_rules.json entry
+
+        A rule matches a run of consecutive token types ("pattern"), optionally
+        only at the start of the sentence and only when its "when" conditions
+        hold, and then either reorders the matched tokens or rewrites their
+        translations ("drop" and "replace").
+
+        Raises:
+            ValueError: If the rule is malformed
+        """
+        self.index = index
+        self.name = spec.get("name", f"rule {index + 1}")
+        self.pattern = tuple(spec.get("pattern") or ())
+        self.at_start = bool(spec.get("at_start", False))
+
+        if not self.pattern:
+            raise ValueError(f"Grammar rule '{self.name}' has no pattern")
+
+        # (token offset, test, argument)
+        self.conditions = []
+        for condition in spec.get("when", []):
+            tests = [test for test in CONDITIONS if test in condition]
+            if len(tests) != 1:
+                raise ValueError(f"Grammar rule '{self.name}' needs exactly one of {', '.join(CONDITIONS)} per condition")
+            argument = condition[tests[0]]
+            if tests[0].endswith("_in"):
+                argument = frozenset(argument)
+            elif not isinstance(argument, str):
+                argument = tuple(argument)
+            self.conditions.append((self._offset(condition.get("token")), tests[0], argument))
+
+        self.reorder = tuple(spec["reorder"]) if "reorder" in spec else None
+        self.drop = [self._offset(token) for token in spec.get("drop", [])]
+        self.replace = [
+            (self._offset(item.get("token")), dict(item.get("map", {})))
+            for item in spec.get("replace", [])
+        ]
+
+        if self.reorder is not None:
+            if sorted(self.reorder) != list(range(len(self.pattern))):
+                raise ValueError(f"Grammar rule '{self.name}': reorder must list each pattern position once")
+            if self.drop or self.replace:
+                raise ValueError(f"Grammar rule '{self.name}' cannot both reorder and rewrite tokens")
+        elif not (self.drop or self.replace):
+            raise ValueError(f"Grammar rule '{self.name}' has no action (reorder, drop or replace)")
+
+    def _offset(self, token):
+        if not isinstance(token, int) or not 0 <= token < len(self.pattern):
+            raise ValueError(f"Grammar rule '{self.name}' refers to token {token!r} outside its pattern")
+        return token
+
+    def holds(self, position, order, values, translated):
+        """Check the rule's conditions for a match starting at position"""
+        for offset, test, argument in self.conditions:
+            i = order[position + offset]
+            subject = values[i] if test.startswith("value") else translated[i]
+            if test.endswith("_in"):
+                if subject not in argument:
+                    return False
+            elif not subject.endswith(argument):
+                return False
+        return True
+
+class GrammarRules:
+    def __init__(self, specs):
+        """
+        Compile grammar rules into a single-pass rule engine
+
+        The patterns are merged into two tries keyed by token type, one for
+        reordering rules and one for rewriting rules, so finding every rule
+        that matches at a position costs one walk down the trie however many
+        rules there are.
+
+        Args:
+            specs (list): Rule definitions, as in grammar_rules.json
+        """
+        self.rules = [GrammarRule(index, spec) for index, spec in enumerate(specs)]
+
+        # A trie node is (children by token type, rules ending at this node)
+        self._reorder_trie = ({}, [])
+        self._rewrite_trie = ({}, [])
+        for rule in self.rules:
+            node = self._reorder_trie if rule.reorder is not None else self._rewrite_trie
+            for token_type in rule.pattern:
+                node = node[0].setdefault(token_type, ({}, []))
+            node[1].append(rule)
+
+        # Rewrites trail the reordering by this many tokens, so they only see
+        # tokens that have reached their final position
+        self._lag = max((len(rule.pattern) - 1 for rule in self.rules if rule.reorder is None), default=0)
+
+    @classmethod
+    def load(cls, data_dir=DATA_DIR):
+        """Load and compile the rules in grammar_rules.json"""
+        with open(Path(data_dir) / "grammar_rules.json", "r") as f:
+            return cls(json.load(f)["rules"])
+
+    def __len__(self):
+        return len(self.rules)
+
+    def apply(self, values, types, order, translated, at_start=True):
+        """
+        Apply every rule to a sentence in one left-to-right scan
+
+        At each position the first reordering rule (in file order) that
+        matches there is applied; a token moved right is matched again at
+        its new position. Rewriting rules run a few tokens behind, on the
+        final word order, and all of those that match are applied in file order.
+
+        Args:
+            values (list): The English tokens
+            types (list): The token types
+            order (list): Token indexes in output order, reordered in place
+            translated (list): The translation of each token, edited in place
+            at_start (bool): Whether order begins at the start of the sentence,
+                for rules that only match there
+        """
+        length = len(order)
+        # Position where at_start rules may match, if any
+        first = 0 if at_start else -1
+        lag = self._lag
+        reorder_root = self._reorder_trie[0]
+        rewrite_root = self._rewrite_trie[0]
+
+        for cursor in range(length + lag):
+            # Most tokens start no pattern at all, so check the first type inline
+            if cursor < length and types[order[cursor]] in reorder_root:
+                for rule in self._matches(reorder_root, cursor, order, types, first):
+                    if rule.holds(cursor, order, values, translated):
+                        end = cursor + len(rule.pattern)
+                        window = order[cursor:end]
+                        order[cursor:end] = [window[k] for k in rule.reorder]
+                        break
+
+            position = cursor - lag
+            if position >= 0 and types[order[position]] in rewrite_root:
+                for rule in self._matches(rewrite_root, position, order, types, first):
+                    if rule.holds(position, order, values, translated):
+                        for offset in rule.drop:
+                            translated[order[position + offset]] = ""
+                        for offset, mapping in rule.replace:
+                            i = order[position + offset]
+                            translated[i] = mapping.get(translated[i], translated[i])
+
+    @staticmethod
+    def _matches(children, position, order, types, first):
+        """Return the rules whose pattern starts at position, in file order"""
+        matches = []
+        for i in range(position, len(order)):
+            node = children.get(types[order[i]])
+            if node is None:
+                break
+            children, rules = node
+            for rule in rules:
+                if not rule.at_start or position == first:
+                    matches.append(rule)
+
+        if len(matches) > 1:
+            matches.sort(key=lambda rule: rule.index)
+        return matches
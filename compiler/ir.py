@@ -0,0 +1,71 @@
+class SentenceIR:
+    """
+    Intermediate representation of one sentence, shared by every stage
+
+    The tokenizer fills the token arrays, the parser annotates phrases in
+    place and the generator reads both, so no stage copies the tokens.
+    Phrases are (phrase type, start, end) index ranges into the token
+    arrays; punctuation inside a range is not part of the phrase. They are
+    None until the parser has been asked to build them.
+    """
+    __slots__ = ("values", "types", "phrases", "is_valid", "message")
+
+    def __init__(self, values, types, phrases=None, is_valid=False, message=None):
+        self.values = values
+        self.types = types
+        self.phrases = phrases
+        self.is_valid = is_valid
+        self.message = message
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """Build an IR from token dicts ({"value", "type"}) as returned by Tokenizer.tokenize"""
+        return cls([token["value"] for token in tokens], [token["type"] for token in tokens])
+
+    def __len__(self):
+        return len(self.values)
+
+    def to_json(self):
+        """Return a JSON-serializable form that shares this IR's lists"""
+        return {
+            "values": self.values,
+            "types": self.types,
+            "phrases": self.phrases,
+            "is_valid": self.is_valid,
+            "message": self.message
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        """Wrap the output of to_json again, without copying it"""
+        return cls(data["values"], data["types"], data["phrases"], data["is_valid"], data["message"])
+
+    def token_dicts(self):
+        """Serialize the tokens in the API's {"value", "type"} shape"""
+        return [{"value": value, "type": token_type} for value, token_type in zip(self.values, self.types)]
+
+    def parse_tree(self):
+        """Serialize the phrase structure in the API's parse tree shape"""
+        if not self.is_valid:
+            return {
+                "type": "SENTENCE",
+                "is_valid": False,
+                "message": self.message
+            }
+
+        values, types = self.values, self.types
+        return {
+            "type": "SENTENCE",
+            "is_valid": True,
+            "children": [
+                {
+                    "type": phrase_type,
+                    "children": [
+                        {"type": types[i], "value": values[i]}
+                        for i in range(start, end)
+                        if types[i] != "PUNCTUATION"
+                    ]
+                }
+                for phrase_type, start, end in self.phrases
+            ]
+        }
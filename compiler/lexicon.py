@@ -0,0 +1,324 @@
+import sys
+import json
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+# Compiled form of the token files, written by build_lexicon.py
+BINARY_FILE = "lexicon.bin"
+BINARY_MAGIC = b"SLXB"
+BINARY_VERSION = 1
+# magic, format version, (unused), entry count, metadata length, source digest
+_HEADER = struct.Struct("<4sHHII20s")
+
+# Dictionary categories in the order the tokenizer resolves them.
+# A word listed in several categories takes the type of the first one.
+CATEGORIES = (
+    ("pronouns", "PRONOUN"),
+    ("verbs", "VERB"),
+    ("articles", "ARTICLE"),
+    ("nouns", "NOUN"),
+    ("adjectives", "ADJECTIVE"),
+    ("prepositions", "PREPOSITION"),
+)
+
+# Words that are not in english_tokens.json but should still be recognized
+EXTRA_ENGLISH_TOKENS = {
+    # Common greeting words
+    "pronouns": [
+        "hi", "hello", "hey", "how", "what", "when", "where", "why", "who"
+    ],
+    # Common name-related words
+    "nouns": [
+        "name", "person", "people", "day", "time", "world", "life", "work",
+        "home", "family", "love", "hate", "hope", "dream", "future", "past",
+        "present"
+    ],
+}
+
+def source_digest(english_raw, spanish_raw):
+    """
+    Fingerprint the sources of a compiled lexicon
+
+    Args:
+        english_raw (bytes): Contents of english_tokens.json
+        spanish_raw (bytes): Contents of spanish_tokens.json
+
+    Returns:
+        bytes: SHA-1 digest, also covering the format and the built-in word lists
+    """
+    digest = hashlib.sha1()
+    digest.update(repr((BINARY_VERSION, CATEGORIES, sorted(EXTRA_ENGLISH_TOKENS.items()))).encode("utf-8"))
+    digest.update(english_raw)
+    digest.update(b"\0")
+    digest.update(spanish_raw)
+    return digest.digest()
+
+def compile_lexicon(english_raw, spanish_raw, binary_path=None):
+    """
+    Build the lexicon for the given token files
+
+    The compiled binary lexicon is used when it exists and was built from
+    exactly these files; otherwise the JSON is parsed.
+
+    Args:
+        english_raw (bytes): Contents of english_tokens.json
+        spanish_raw (bytes): Contents of spanish_tokens.json
+        binary_path (Path): Compiled lexicon to try first, or None
+
+    Returns:
+        Lexicon or MappedLexicon: The lexicon
+    """
+    if binary_path is not None and Path(binary_path).exists():
+        try:
+            lexicon = MappedLexicon(binary_path)
+            if lexicon.digest == source_digest(english_raw, spanish_raw):
+                return lexicon
+            print(f"{binary_path} is out of date; run build_lexicon.py to rebuild it")
+        except (OSError, ValueError) as e:
+            print(f"Error loading compiled lexicon {binary_path}: {str(e)}")
+
+    return Lexicon(json.loads(english_raw), json.loads(spanish_raw))
+
+class Lexicon:
+    __slots__ = ("entries", "secondary")
+
+    # Words are held in memory, not looked up in a mapped file
+    mapped = False
+
+    def __init__(self, english_tokens, spanish_tokens):
+        """
+        Compile the English and Spanish token dictionaries into one index
+
+        Args:
+            english_tokens (dict): Category -> English words, as in english_tokens.json
+            spanish_tokens (dict): Category -> English-to-Spanish mapping, as in spanish_tokens.json
+        """
+        # word -> (token type, Spanish translation)
+        self.entries = {}
+        # (word, token type) -> Spanish translation, for words that also
+        # appear in a lower-priority category
+        self.secondary = {}
+
+        for category, token_type in CATEGORIES:
+            words = list(english_tokens.get(category, {}))
+            words.extend(EXTRA_ENGLISH_TOKENS.get(category, []))
+            translations = spanish_tokens.get(category, {})
+
+            for word in words:
+                word = sys.intern(word)
+                translation = sys.intern(translations.get(word, word))
+
+                if word not in self.entries:
+                    self.entries[word] = (token_type, translation)
+                elif translation != word:
+                    self.secondary[(word, token_type)] = translation
+
+    @classmethod
+    def load(cls, data_dir=DATA_DIR):
+        """Load and compile the lexicon from the JSON token files"""
+        data_dir = Path(data_dir)
+
+        with open(data_dir / "english_tokens.json", "r") as f:
+            english_tokens = json.load(f)
+
+        with open(data_dir / "spanish_tokens.json", "r") as f:
+            spanish_tokens = json.load(f)
+
+        return cls(english_tokens, spanish_tokens)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, word):
+        """
+        Look up a lower-cased word
+
+        Returns:
+            tuple: (token type, Spanish translation), or None if the word is unknown
+        """
+        return self.entries.get(word)
+
+    def translate(self, word, token_type):
+        """
+        Translate a word as the given token type
+
+        Unknown words and punctuation are returned unchanged.
+        """
+        entry = self.entries.get(word)
+        if entry is not None and entry[0] == token_type:
+            return entry[1]
+        return self.secondary.get((word, token_type), word)
+
+    def write_binary(self, path, digest):
+        """
+        Write the lexicon in the compiled format read by MappedLexicon
+
+        Entries are sorted by their UTF-8 bytes and stored as two offset
+        tables into string blobs plus a type table, so a lookup is a binary
+        search over the mapped file. The file is replaced atomically, so
+        processes that have the old one mapped keep a consistent view.
+
+        Args:
+            path (Path): Output file
+            digest (bytes): source_digest() of the token files
+        """
+        words = sorted(self.entries, key=lambda word: word.encode("utf-8"))
+        type_names = sorted({entry[0] for entry in self.entries.values()} | {key[1] for key in self.secondary})
+        type_ids = {name: i for i, name in enumerate(type_names)}
+
+        meta = json.dumps({
+            "types": type_names,
+            "secondary": [[word, token_type, translation] for (word, token_type), translation in self.secondary.items()]
+        }, ensure_ascii=False).encode("utf-8")
+
+        word_blob = bytearray()
+        translation_blob = bytearray()
+        word_offsets = array("I", [0])
+        translation_offsets = array("I", [0])
+        types = bytearray()
+        for word in words:
+            token_type, translation = self.entries[word]
+            word_blob += word.encode("utf-8")
+            translation_blob += translation.encode("utf-8")
+            word_offsets.append(len(word_blob))
+            translation_offsets.append(len(translation_blob))
+            types.append(type_ids[token_type])
+
+        if sys.byteorder != "little":
+            word_offsets.byteswap()
+            translation_offsets.byteswap()
+
+        path = Path(path)
+        partial = path.with_name(path.name + ".tmp")
+        with open(partial, "wb") as f:
+            f.write(_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(words), len(meta), digest))
+            f.write(meta)
+            f.write(b"\0" * _padding(f.tell()))
+            f.write(word_offsets.tobytes())
+            f.write(translation_offsets.tobytes())
+            f.write(types)
+            f.write(b"\0" * _padding(f.tell()))
+            f.write(word_blob)
+            f.write(translation_blob)
+        os.replace(partial, path)
+
+def _padding(position):
+    return -position % 4
+
+# Marks a word that is not in a MappedLexicon's memo yet
+_UNSEEN = object()
+
+class MappedLexicon:
+    # Words are looked up in the mapped file
+    mapped = True
+
+    # Most distinct words remembered per process before the memo is reset
+    MEMO_LIMIT = 65536
+
+    def __init__(self, path):
+        """
+        Open a lexicon compiled by Lexicon.write_binary
+
+        The file is memory-mapped read-only, so opening it costs the same
+        however large the vocabulary is and every process on the machine
+        shares one copy through the page cache. Words are found by binary
+        search and remembered in a small per-process memo, as traffic keeps
+        hitting the same few thousand words.
+
+        Raises:
+            ValueError: If the file is not a compiled lexicon of this version
+        """
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < _HEADER.size:
+            raise ValueError("Truncated lexicon file")
+        magic, version, _, count, meta_length, digest = _HEADER.unpack_from(self._map, 0)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError("Not a compiled lexicon of a supported version")
+        if sys.byteorder != "little":
+            raise ValueError("Compiled lexicons can only be mapped on little-endian machines")
+
+        self.digest = digest
+        self._count = count
+
+        position = _HEADER.size
+        meta = json.loads(self._map[position:position + meta_length])
+        self._type_names = [sys.intern(name) for name in meta["types"]]
+        self.secondary = {(word, token_type): translation for word, token_type, translation in meta["secondary"]}
+        position += meta_length + _padding(position + meta_length)
+
+        view = memoryview(self._map)
+        table = 4 * (count + 1)
+        self._word_offsets = view[position:position + table].cast("I")
+        position += table
+        self._translation_offsets = view[position:position + table].cast("I")
+        position += table
+        self._types = view[position:position + count]
+        position += count + _padding(position + count)
+
+        self._words_start = position
+        self._translations_start = position + self._word_offsets[count]
+        if self._translations_start + self._translation_offsets[count] > len(self._map):
+            raise ValueError("Truncated lexicon file")
+
+        # word -> (token type, translation) or None
+        self._memo = {}
+
+    def __len__(self):
+        return self._count
+
+    def lookup(self, word):
+        """
+        Look up a lower-cased word
+
+        Returns:
+            tuple: (token type, Spanish translation), or None if the word is unknown
+        """
+        entry = self._memo.get(word, _UNSEEN)
+        if entry is _UNSEEN:
+            entry = self._find(word)
+            if len(self._memo) >= self.MEMO_LIMIT:
+                self._memo.clear()
+            self._memo[word] = entry
+        return entry
+
+    def translate(self, word, token_type):
+        """
+        Translate a word as the given token type
+
+        Unknown words and punctuation are returned unchanged.
+        """
+        entry = self.lookup(word)
+        if entry is not None and entry[0] == token_type:
+            return entry[1]
+        return self.secondary.get((word, token_type), word)
+
+    def _find(self, word):
+        """Binary search the mapped word table"""
+        key = word.encode("utf-8")
+        data = self._map
+        offsets = self._word_offsets
+        start = self._words_start
+
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            candidate = data[start + offsets[middle]:start + offsets[middle + 1]]
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                translations = self._translation_offsets
+                begin = self._translations_start
+                translation = data[begin + translations[middle]:begin + translations[middle + 1]].decode("utf-8")
+                return self._type_names[self._types[middle]], sys.intern(translation)
+
+        return None
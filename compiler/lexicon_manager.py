@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from compiler.generator import Generator
+from compiler.grammar import GrammarRules
+from compiler.lexicon import BINARY_FILE, DATA_DIR, compile_lexicon
+from compiler.parser import Parser
+from compiler.phrases import PhraseTable
+from compiler.tokenizer import Tokenizer
+
+# Data files the rule engine is built from
+DATA_FILES = ("english_tokens.json", "spanish_tokens.json", "phrase_table.json", "grammar_rules.json")
+
+# Watched as well: rebuilding the compiled lexicon swaps it in
+WATCHED_FILES = DATA_FILES + (BINARY_FILE,)
+
+class LexiconBundle:
+    __slots__ = ("version", "lexicon", "phrases", "rules", "tokenizer", "generator")
+
+    def __init__(self, version, lexicon, phrases, rules):
+        """
+        One build of the rule engine's data, never modified once built
+
+        A request takes the current bundle once and uses it throughout, so
+        it sees a consistent lexicon even if a reload swaps in a new one
+        while it runs.
+        """
+        self.version = version
+        self.lexicon = lexicon
+        self.phrases = phrases
+        self.rules = rules
+        self.tokenizer = Tokenizer(lexicon)
+        self.generator = Generator(lexicon, rules, phrases)
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "lexicon_entries": len(self.lexicon),
+            "lexicon_format": "mapped" if self.lexicon.mapped else "json",
+            "phrases": len(self.phrases),
+            "grammar_rules": len(self.rules)
+        }
+
+class LexiconManager:
+    def __init__(self, data_dir=DATA_DIR, corrections=None, validation_texts=()):
+        """
+        Build the rule engine's data and swap in new builds without a restart
+
+        Args:
+            data_dir (Path): Directory holding the data files
+            corrections (callable): Returns (English, Spanish) pairs added to the
+                phrase table on every build, or None
+            validation_texts (list): Sentences a new build must translate
+                successfully before it replaces the current one
+        """
+        self.data_dir = Path(data_dir)
+        self.corrections = corrections
+        self.validation_texts = list(validation_texts)
+
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.last_error = None
+
+        self._mtimes = self._stat()
+        self.current = self.build()
+
+    def build(self, previous=None):
+        """
+        Build and validate a bundle from the data files
+
+        Args:
+            previous (LexiconBundle): The bundle being replaced, if any; a
+                build that lost more than half of its entries is rejected
+
+        Returns:
+            LexiconBundle: The new bundle
+
+        Raises:
+            ValueError: If the data cannot be read or fails validation
+        """
+        try:
+            raw = {name: (self.data_dir / name).read_bytes() for name in DATA_FILES}
+            phrase_table = json.loads(raw["phrase_table.json"])
+            grammar_rules = json.loads(raw["grammar_rules.json"])
+            corrections = list(self.corrections()) if self.corrections is not None else []
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Could not read the lexicon data: {str(e)}")
+
+        digest = hashlib.sha1()
+        for name in DATA_FILES:
+            digest.update(raw[name])
+        digest.update(json.dumps(corrections, ensure_ascii=False).encode("utf-8"))
+
+        try:
+            # Served from the compiled lexicon when it is up to date
+            lexicon = compile_lexicon(
+                raw["english_tokens.json"], raw["spanish_tokens.json"], self.data_dir / BINARY_FILE
+            )
+            phrases = PhraseTable(phrase_table["phrases"])
+            rules = GrammarRules(grammar_rules["rules"])
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Malformed lexicon data: {type(e).__name__}: {str(e)}")
+
+        # Corrections are added last, so they take precedence over the phrase table
+        for english, spanish in corrections:
+            phrases.add(english, spanish)
+
+        bundle = LexiconBundle(digest.hexdigest()[:12], lexicon, phrases, rules)
+        self._validate(bundle, previous)
+        return bundle
+
+    def reload(self, force=False):
+        """
+        Rebuild the bundle and swap it in if the data changed
+
+        The current bundle stays in place if the build fails.
+
+        Args:
+            force (bool): Skip the check against the previous entry count
+
+        Returns:
+            tuple: (previous bundle, current bundle); the same bundle twice
+            if nothing changed. The versions are equal if only the lexicon's
+            format changed, e.g. when the compiled lexicon was rebuilt.
+
+        Raises:
+            ValueError: If the new data fails to build or validate
+        """
+        with self._lock:
+            # Taken before reading, so an edit made during the build is seen next time
+            self._mtimes = self._stat()
+            previous = self.current
+
+            try:
+                bundle = self.build(None if force else previous)
+            except ValueError as e:
+                self.last_error = str(e)
+                raise
+
+            self.last_error = None
+            if bundle.version == previous.version and bundle.lexicon.mapped == previous.lexicon.mapped:
+                return previous, previous
+
+            self.current = bundle
+            self.reloads += 1
+            return previous, bundle
+
+    def changed(self):
+        """Check whether a data file was modified since the last build"""
+        return self._stat() != self._mtimes
+
+    def status(self):
+        return {
+            **self.current.describe(),
+            "reloads": self.reloads,
+            "last_error": self.last_error
+        }
+
+    def _stat(self):
+        stats = []
+        for name in WATCHED_FILES:
+            try:
+                stat = os.stat(self.data_dir / name)
+                stats.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stats.append(None)
+        return stats
+
+    def _validate(self, bundle, previous):
+        if not len(bundle.lexicon):
+            raise ValueError("The lexicon is empty")
+
+        # Most likely a truncated or half-written file
+        if previous is not None and len(bundle.lexicon) < len(previous.lexicon) // 2:
+            raise ValueError(
+                f"The lexicon shrank from {len(previous.lexicon)} to {len(bundle.lexicon)} entries; "
+                "reload with force to accept it"
+            )
+
+        parser = Parser()
+        for text in self.validation_texts:
+            sentence = bundle.tokenizer.tokenize_ir(text)
+            parser.annotate(sentence, phrases=False)
+            result = bundle.generator.generate(sentence)
+            if not result["success"]:
+                raise ValueError(f"The new lexicon cannot translate {text!r}: {result.get('error')}")
@@ -0,0 +1,172 @@
+import contextvars
+import threading
+from bisect import bisect_left
+
+import config
+
+# Upper bounds of the latency buckets, in seconds: from 50 microseconds for
+# a dictionary lookup up to 30 seconds for loading the model
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+# Stage timings of the request being served, or None when it did not ask for them
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        Cumulative-bucket histogram in the Prometheus layout
+
+        Args:
+            buckets (tuple): Sorted upper bounds; a +Inf bucket is added
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # Not locked; callers hold the lock of the registry that owns the histogram
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """Return (upper bound, cumulative count) pairs, ending with +Inf"""
+        samples = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            samples.append((bound, total))
+        return samples
+
+class Metrics:
+    def __init__(self, enabled=True):
+        """
+        Process-wide latency histograms of the translation stages
+
+        Stages record themselves with observe(), one histogram per
+        (stage, engine) pair, so the numbers say where time goes inside a
+        request: tokenizing, parsing, generating, waiting for a batch or
+        running the model. Recording costs one lock and a bisect, cheap
+        enough to leave on under load.
+
+        Args:
+            enabled (bool): Record anything at all
+        """
+        self.enabled = enabled
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, engine="rule-based"):
+        """
+        Record how long a stage took
+
+        The time is also added to the current request's timings when it
+        asked for them (see collect()).
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            histogram = self.histograms.get((stage, engine))
+            if histogram is None:
+                histogram = self.histograms[(stage, engine)] = Histogram()
+            histogram.observe(seconds)
+
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    def note(self, stage, seconds):
+        """Add time to the current request's timings only, e.g. its share of a batch"""
+        if not self.enabled:
+            return
+
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    @staticmethod
+    def collect():
+        """
+        Start collecting stage timings for the request running in this context
+
+        Returns:
+            dict: Stage -> seconds, filled in as the request runs
+        """
+        timings = {}
+        _request_timings.set(timings)
+        return timings
+
+    @staticmethod
+    def stop_collecting():
+        _request_timings.set(None)
+
+    def snapshot(self):
+        """Return a copy of every histogram, keyed by (stage, engine)"""
+        with self._lock:
+            copies = {}
+            for key, histogram in self.histograms.items():
+                copy = Histogram(histogram.buckets)
+                copy.counts = list(histogram.counts)
+                copy.sum = histogram.sum
+                copy.count = histogram.count
+                copies[key] = copy
+            return copies
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+def render(families):
+    """
+    Format metric families in the Prometheus text exposition format
+
+    Args:
+        families (list): (name, type, help, samples) tuples. For counters
+            and gauges, samples are (labels dict, value) pairs; for
+            histograms, (labels dict, Histogram) pairs.
+
+    Returns:
+        str: The exposition text
+    """
+    lines = []
+    for name, metric_type, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+        for labels, value in samples:
+            if metric_type != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+
+            for bound, total in value.samples():
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {total}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(value.sum)}")
+            lines.append(f"{name}_count{_labels(labels)} {value.count}")
+
+    return "\n".join(lines) + "\n"
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _number(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+# Shared by every stage in the process; forked workers each get their own copy
+METRICS = Metrics(enabled=config.METRICS)
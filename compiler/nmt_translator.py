@@ -1,61 +1,195 @@
-import torch
-from transformers import MarianMTModel, MarianTokenizer
 import os
+import threading
+import time
+
+from compiler.metrics import METRICS
 
 class NMTTranslator:
-    def __init__(self, model_name="Helsinki-NLP/opus-mt-en-es"):
-       
+    def __init__(self, model_name="Helsinki-NLP/opus-mt-en-es", quantize=False, num_threads=None,
+                 num_beams=None, max_new_tokens=None, greedy=False, retry_seconds=60.0):
+        """
+        Args:
+            model_name (str): Hugging Face model name
+            quantize (bool): Apply dynamic int8 quantization to the Linear layers (CPU only)
+            num_threads (int): Intra-op thread count for torch, or None for the torch default
+            num_beams (int): Beam width for generate, or None for the model default
+            max_new_tokens (int): Longest generated translation, or None for the model default
+            greedy (bool): Use greedy decoding (a single beam) regardless of num_beams
+            retry_seconds (float): After a failed load, how long translations
+                fail straight away before loading is tried again (0 retries every time)
+        """
         self.model_name = model_name
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Chosen when the model loads, so importing this module does not need torch
+        self.device = None
+        
+        # CPU inference profile; quantization is skipped on GPU
+        self.quantize = quantize
+        self.num_threads = num_threads
+        self.generate_kwargs = {}
+        if greedy:
+            self.generate_kwargs["num_beams"] = 1
+        elif num_beams:
+            self.generate_kwargs["num_beams"] = num_beams
+        if max_new_tokens:
+            self.generate_kwargs["max_new_tokens"] = max_new_tokens
         
         # Load model and tokenizer on first use
         self.model = None
         self.tokenizer = None
         
+        # One of "not_loaded", "loading", "loaded" or "failed"
+        self.status = "not_loaded"
+        
+        # (monotonic time, error) of the last failed load, until it is retried
+        self.retry_seconds = retry_seconds
+        self._failure = None
+        
+        # Concurrent first requests must not each load the model
+        self._load_lock = threading.Lock()
+        
     def _load_model(self):
-        """Lazy-load the model to save memory until translation is needed"""
-        if self.model is None or self.tokenizer is None:
+        """
+        Lazy-load the model to save memory until translation is needed
+        
+        Returns:
+            tuple: (model, tokenizer), still usable if unload() runs meanwhile
+        """
+        model, tokenizer = self.model, self.tokenizer
+        if model is not None and tokenizer is not None:
+            return model, tokenizer
+        self._check_failure()
+        
+        with self._load_lock:
+            # Another thread may have finished loading while we waited
+            model, tokenizer = self.model, self.tokenizer
+            if model is not None and tokenizer is not None:
+                return model, tokenizer
+            # Or failed to
+            self._check_failure()
+            
+            self.status = "loading"
+            started = time.perf_counter()
             try:
-                self.tokenizer = MarianTokenizer.from_pretrained(self.model_name)
-                self.model = MarianMTModel.from_pretrained(self.model_name).to(self.device)
+                import torch
+                from transformers import MarianMTModel, MarianTokenizer
+                
+                self.device = "cuda" if torch.cuda.is_available() else "cpu"
+                if self.num_threads:
+                    torch.set_num_threads(self.num_threads)
+                
+                tokenizer = MarianTokenizer.from_pretrained(self.model_name)
+                model = MarianMTModel.from_pretrained(self.model_name).to(self.device)
+                model.eval()
+                
+                if self.quantize and self.device == "cpu":
+                    # int8 weights for the Linear layers: smaller and faster on CPU
+                    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
             except Exception as e:
                 print(f"Error loading NMT model: {str(e)}")
                 # Fall back to rule-based if model can't be loaded
-                self.model = None
-                self.tokenizer = None
+                self.status = "failed"
+                self._failure = (time.monotonic(), str(e))
                 raise RuntimeError(f"Failed to load NMT model: {str(e)}")
             
+            self.tokenizer = tokenizer
+            self.model = model
+            self.status = "loaded"
+            self._failure = None
+            METRICS.observe("model_load", time.perf_counter() - started, engine="nmt")
+            return model, tokenizer
+    
+    def unload(self):
+        """
+        Drop the model to free its memory; the next translation loads it again
+        
+        A batch already running keeps its own reference and finishes first.
+        After a failed load, the next translation tries again right away.
+        """
+        with self._load_lock:
+            self.model = None
+            self.tokenizer = None
+            self.status = "not_loaded"
+            self._failure = None
+    
+    def _check_failure(self):
+        """Raise the last load error again while it is too recent to retry"""
+        failure = self._failure
+        if failure is None:
+            return
+        failed_at, error = failure
+        remaining = failed_at + self.retry_seconds - time.monotonic()
+        if remaining > 0:
+            raise RuntimeError(f"Failed to load NMT model: {error} (retrying in {remaining:.0f} s)")
+            
+    def warm_up(self, texts):
+        """
+        Load the model and run one batch through it
+        
+        The first generate call pays for one-off setup inside torch, so
+        running it at startup keeps that cost out of the first request.
+        
+        Args:
+            texts (list): Texts in the model's source language
+            
+        Returns:
+            bool: Whether the model loaded and translated the batch
+        """
+        results = self.translate_batch(texts)
+        return all(result["success"] for result in results)
+            
     def translate(self, text):
         """
-        Translate text from English to Spanish using the NMT model
+        Translate text with the NMT model, from its source to its target language
+        
+        Args:
+            text (str): Text to translate
+            
+        Returns:
+            dict: The translation result
+        """
+        return self.translate_batch([text])[0]
+
+    def translate_batch(self, texts):
+        """
+        Translate several texts with a single padded generate call
         
         Args:
-            text (str): English text to translate
+            texts (list): Texts to translate
             
         Returns:
-            str: The translated Spanish text
+            list: One result dict per input, in input order
         """
         try:
             # Make sure the model is loaded
-            self._load_model()
+            model, tokenizer = self._load_model()
+            import torch
             
-            # Tokenize and translate
-            inputs = self.tokenizer(text, return_tensors="pt", padding=True).to(self.device)
-            translated = self.model.generate(**inputs)
+            started = time.perf_counter()
+            # Tokenize the whole batch into one padded tensor and translate
+            inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True).to(self.device)
+            with torch.inference_mode():
+                translated = model.generate(**inputs, **self.generate_kwargs)
             
-            # Decode the translation
-            translation = self.tokenizer.decode(translated[0], skip_special_tokens=True)
+            # Decode each translation
+            translations = tokenizer.batch_decode(translated, skip_special_tokens=True)
+            METRICS.observe("inference", time.perf_counter() - started, engine="nmt")
             
-            return {
-                "success": True,
-                "translation": translation,
-                "model": "nmt"
-            }
+            return [
+                {
+                    "success": True,
+                    "translation": translation,
+                    "model": "nmt"
+                }
+                for translation in translations
+            ]
             
         except Exception as e:
-            # Return error so the system can fall back to the rule-based approach
-            return {
-                "success": False,
-                "error": f"NMT translation failed: {str(e)}",
-                "model": "nmt"
-            } 
\ No newline at end of file
+            # Return errors so the system can fall back to the rule-based approach
+            return [
+                {
+                    "success": False,
+                    "error": f"NMT translation failed: {str(e)}",
+                    "model": "nmt"
+                }
+                for _ in texts
+            ]
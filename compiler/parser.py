@@ -1,3 +1,8 @@
+import time
+
+from compiler.ir import SentenceIR
+from compiler.metrics import METRICS
+
 class Parser:
     def __init__(self):
         """Initialize the parser for analyzing tokenized input"""
@@ -21,63 +26,84 @@ class Parser:
         Returns:
             dict: Parse tree structure
         """
-        # Filter out punctuation
-        filtered_tokens = [token for token in tokens if token["type"] != "PUNCTUATION"]
+        sentence = SentenceIR.from_tokens(tokens)
+        self.annotate(sentence)
+        return sentence.parse_tree()
+    
+    def annotate(self, sentence, phrases=True):
+        """
+        Group the tokens of a sentence into phrases, in place
         
-        if not filtered_tokens:
-            return {
-                "type": "SENTENCE",
-                "is_valid": False,
-                "message": "No valid tokens found"
-            }
-
-        # Group tokens into phrases
-        phrases = self._group_into_phrases(filtered_tokens)
+        Args:
+            sentence (SentenceIR): The tokenized sentence
+            phrases (bool): Build the phrase structure. Translation only needs
+                to know whether the sentence is valid, so the phrases can be
+                skipped when no parse tree will be returned.
+            
+        Returns:
+            SentenceIR: The same sentence, with phrases (if requested) and validity set
+        """
+        started = time.perf_counter()
+        if phrases:
+            sentence.phrases = self._group_into_phrases(sentence.types)
+            has_words = bool(sentence.phrases)
+        else:
+            sentence.phrases = None
+            has_words = any(token_type != "PUNCTUATION" for token_type in sentence.types)
         
-        # Create the parse tree
-        parse_tree = {
-            "type": "SENTENCE",
-            "is_valid": True,
-            "children": phrases
-        }
+        if has_words:
+            sentence.is_valid = True
+            sentence.message = None
+        else:
+            # Nothing but punctuation (or nothing at all)
+            sentence.is_valid = False
+            sentence.message = "No valid tokens found"
         
-        return parse_tree
+        METRICS.observe("parse", time.perf_counter() - started)
+        return sentence
     
-    def _group_into_phrases(self, tokens):
-        """Group tokens into meaningful phrases"""
+    def phrase_sequence(self, types):
+        """
+        Return the types of the phrases a token type sequence groups into
+
+        Args:
+            types (list): Token types of a sentence
+
+        Returns:
+            list: Phrase types, in order (None for a phrase of unknown tokens)
+        """
+        return [phrase_type for phrase_type, _, _ in self._group_into_phrases(types)]
+
+    def _group_into_phrases(self, types):
+        """Group tokens into meaningful phrases, as index ranges"""
         phrases = []
-        current_phrase = []
+        start = None
+        end = None
         current_phrase_type = None
         
-        for token in tokens:
-            token_type = token["type"]
+        for i, token_type in enumerate(types):
+            # Punctuation is not part of any phrase
+            if token_type == "PUNCTUATION":
+                continue
             
             # Determine if this token starts a new phrase
-            if token_type in self.phrase_types:
-                phrase_type = self.phrase_types[token_type]
-                
+            phrase_type = self.phrase_types.get(token_type)
+            if phrase_type is not None:
                 # If we have a current phrase and this token starts a new phrase type
-                if current_phrase and current_phrase_type != phrase_type:
+                if start is not None and current_phrase_type != phrase_type:
                     # Add the completed phrase to our list
-                    phrases.append({
-                        "type": current_phrase_type,
-                        "children": current_phrase
-                    })
-                    current_phrase = []
+                    phrases.append((current_phrase_type, start, end))
+                    start = None
                 
                 current_phrase_type = phrase_type
             
             # Add the token to the current phrase
-            current_phrase.append({
-                "type": token_type,
-                "value": token["value"]
-            })
+            if start is None:
+                start = i
+            end = i + 1
         
         # Add the last phrase if there is one
-        if current_phrase:
-            phrases.append({
-                "type": current_phrase_type or "UNKNOWN_PHRASE",
-                "children": current_phrase
-            })
+        if start is not None:
+            phrases.append((current_phrase_type or "UNKNOWN_PHRASE", start, end))
         
-        return phrases 
\ No newline at end of file
+        return phrases
@@ -0,0 +1,91 @@
+import json
+from pathlib import Path
+
+from compiler.lexicon import DATA_DIR
+from compiler.tokenizer import Tokenizer
+
+# Trie key holding the translation of the phrase that ends at a node; never a token
+_TRANSLATION = None
+
+class PhraseTable:
+    def __init__(self, phrases=None):
+        """
+        Translation memory for multi-word expressions
+
+        Phrases are stored in a trie keyed on normalized tokens, the same
+        ones the tokenizer produces, so a sentence is matched against every
+        phrase in one left-to-right scan.
+
+        Args:
+            phrases (dict): English phrase -> Spanish translation
+        """
+        self.root = {}
+        self.size = 0
+
+        for english, spanish in (phrases or {}).items():
+            self.add(english, spanish)
+
+    @classmethod
+    def load(cls, data_dir=DATA_DIR):
+        """Load the phrase table from phrase_table.json"""
+        with open(Path(data_dir) / "phrase_table.json", "r") as f:
+            return cls(json.load(f)["phrases"])
+
+    def __len__(self):
+        return self.size
+
+    def add(self, english, spanish):
+        """Add a phrase, replacing any earlier translation of it"""
+        tokens = Tokenizer.TOKEN_RE.findall(Tokenizer.normalize(english))
+        if not tokens or not spanish:
+            return
+
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+
+        if _TRANSLATION not in node:
+            self.size += 1
+        node[_TRANSLATION] = spanish
+
+    def matches(self, values):
+        """
+        Find the phrases in a tokenized sentence
+
+        Matching is greedy from the left and takes the longest phrase
+        starting at each position; matches never overlap.
+
+        Args:
+            values (list): The sentence's token values
+
+        Returns:
+            list: (start, end, translation) for each phrase found, in order
+        """
+        found = []
+        root = self.root
+        length = len(values)
+        start = 0
+
+        while start < length:
+            node = root.get(values[start])
+            if node is None:
+                start += 1
+                continue
+
+            end = None
+            i = start
+            while node is not None:
+                i += 1
+                if _TRANSLATION in node:
+                    end, translation = i, node[_TRANSLATION]
+                if i == length:
+                    break
+                node = node.get(values[i])
+
+            if end is None:
+                start += 1
+            else:
+                found.append((start, end, translation))
+                start = end
+
+        return found
@@ -0,0 +1,737 @@
+import asyncio
+import sqlite3
+
+import config
+from compiler.cache import TranslationCache
+from compiler.engines import EngineRegistry
+from compiler.executor import BoundedExecutor, Overloaded
+from compiler.ir import SentenceIR
+from compiler.metrics import METRICS
+from compiler.segmenter import Segmenter
+from compiler.parser import Parser
+from compiler.router import Router
+from compiler.sessions import SessionClosed, SessionStore, Superseded
+from storage.report_store import ReportStore
+
+class TranslationPipeline:
+    def __init__(self, pairs_path=None):
+        """
+        Build the translation pipeline once per process.
+
+        Every language pair has its own lexicon and NMT model, kept in the
+        engine registry; methods take the pair as "source-target" and use
+        the default pair when it is None. The default pair is built here:
+        its token dictionaries are compiled into one lexicon, shared by the
+        tokenizer and generator, so requests only pay for dictionary
+        lookups. The lexicon manager can rebuild them later without a
+        restart; see reload_lexicon(). The default model is loaded by
+        start() or, in lazy mode, on first use; other pairs are built and
+        their models loaded when first asked for.
+
+        Args:
+            pairs_path (Path): The language pairs file, by default SMARTLANG_LANGUAGE_PAIRS_PATH
+        """
+        self.engines = EngineRegistry(
+            pairs_path or config.LANGUAGE_PAIRS_PATH,
+            max_models=config.NMT_MAX_MODELS,
+            idle_seconds=config.NMT_IDLE_SECONDS,
+            corrections=self._corrections if config.PHRASE_CORRECTIONS else None,
+            validation_texts=config.NMT_WARMUP_TEXTS,
+            nmt_options={
+                "quantize": config.NMT_QUANTIZE,
+                "num_threads": config.NMT_THREADS,
+                "num_beams": config.NMT_NUM_BEAMS,
+                "max_new_tokens": config.NMT_MAX_NEW_TOKENS,
+                "greedy": config.NMT_GREEDY,
+                "retry_seconds": config.NMT_RETRY_SECONDS
+            }
+        )
+        self.segmenter = Segmenter()
+        self.parser = Parser()
+        self.rule_executor = BoundedExecutor("rule-based", config.RULE_WORKERS, config.RULE_MAX_QUEUE)
+        self.router = Router(
+            self.parser,
+            threshold=config.ROUTER_THRESHOLD,
+            max_words=config.ROUTER_MAX_WORDS,
+            enabled=config.ROUTING
+        )
+        self.sessions = SessionStore(config.SESSION_MAX, config.SESSION_IDLE_SECONDS)
+        self.cache = TranslationCache(
+            max_entries=config.CACHE_MAX_ENTRIES,
+            max_bytes=config.CACHE_MAX_BYTES,
+            ttl_seconds=config.CACHE_TTL_SECONDS,
+            path=config.CACHE_PATH or None
+        )
+
+        # Set once startup work is done and the pipeline can take traffic
+        self.ready = False
+        self.warmed_up = False
+
+        # Requests given up on by translate_async
+        self.timeouts = 0
+
+    def translate_rule_based(self, text, pair=None):
+        """
+        Translate text with the compiler pipeline (tokenize -> parse -> generate)
+
+        Each sentence is translated on its own, so the cost grows linearly
+        with the length of the text and grammar rules apply per sentence.
+
+        Args:
+            text (str): English text to translate
+            pair (str): The language pair, or None for the default pair
+
+        Returns:
+            dict: The translation result, with the parsed sentences in
+            IR form; see serialize()
+        """
+        return self._translate_rule_based(text, self.engines.get(pair))
+
+    def _translate_rule_based(self, text, engine):
+        """Translate text with the rule engine of a pair; see translate_rule_based()"""
+        if engine.lexicons is None:
+            # Zero confidence, so routing always picks the model
+            return {
+                "success": False,
+                "translation": None,
+                "error": f"No rule-based translator for {engine.name}",
+                "sentences": [],
+                "model_used": "rule-based",
+                "confidence": 0.0
+            }
+
+        # The whole text is translated with the lexicon current at the start
+        bundle = engine.lexicons.current
+
+        spans = self.segmenter.segment(text)
+        if len(spans) <= 1:
+            return self._translate_sentence(text, bundle)
+
+        results = [self._translate_sentence(text[start:end], bundle) for start, end in spans]
+        errors = [result["error"] for result in results if result["error"]]
+
+        return {
+            "success": all(result["success"] for result in results),
+            "translation": self.segmenter.stitch(
+                text, spans,
+                [result["translation"] or text[start:end] for (start, end), result in zip(spans, results)]
+            ),
+            "error": "; ".join(errors) or None,
+            "sentences": [sentence for result in results for sentence in result["sentences"]],
+            "model_used": "rule-based",
+            # The text is only as reliable as its weakest sentence
+            "confidence": min(result["confidence"] for result in results)
+        }
+
+    def _translate_sentence(self, text, bundle):
+        """Translate a single sentence with the compiler pipeline and the given lexicon bundle"""
+        # Keyed on the lexicon version, so a reload never serves results of the old lexicon
+        key = self.cache.key("rule-based", bundle.version, bundle.tokenizer.normalize(text))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Every stage works on the same IR; nothing is copied between them
+        # Phrases are only needed for parse trees; serialize() builds them on demand
+        sentence = bundle.tokenizer.tokenize_ir(text)
+        self.parser.annotate(sentence, phrases=False)
+        result = bundle.generator.generate(sentence)
+
+        result = {
+            "success": result["success"],
+            "translation": result.get("translation"),
+            "error": result.get("error"),
+            "sentences": [sentence.to_json()],
+            "model_used": "rule-based",
+            "confidence": self.router.score(sentence, bundle.lexicon, bundle.phrases)
+        }
+        self.cache.put(key, result)
+        return result
+
+    async def translate_async(self, text, use_nmt=True, timeout=None, pair=None):
+        """
+        Translate text from a request handler
+
+        NMT requests go through the micro-batcher so concurrent requests
+        share one generate call and the model never runs on the event loop.
+        Long texts are translated by the rule engine in a worker thread.
+
+        Args:
+            text (str): Text to translate
+            use_nmt (bool): Whether NMT may be used. With routing on, only
+                texts the rule engine is not confident about go to NMT.
+            timeout (float): Seconds to give up after, or None for no limit.
+                Work still queued for the text is dropped.
+            pair (str): The language pair, or None for the default pair
+
+        Returns:
+            dict: The translation result
+
+        Raises:
+            UnsupportedPair: If the pair is not configured
+            Overloaded: If a queue is full or the timeout passed
+        """
+        engine = await self._engine(pair)
+        try:
+            return await asyncio.wait_for(self._translate_async(text, use_nmt, engine), timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out(timeout, engine)
+
+    async def _translate_async(self, text, use_nmt, engine):
+        if use_nmt:
+            chosen, scored = await self._route_async(text, engine)
+            if chosen == "rule-based":
+                return scored
+            return await self._from_nmt(text, await self._translate_nmt(text, engine), engine, scored)
+
+        return await self._rule_based(text, engine)
+
+    async def translate_session(self, session_id, revision, text, use_nmt=True, timeout=None, pair=None):
+        """
+        Translate the latest text of a type-as-you-go client
+
+        Only the sentences that are new since the session's previous call
+        are translated; the others reuse their results, so a keystroke costs
+        about one sentence rather than the whole text. A call still running
+        for an older revision is cancelled, along with its queued NMT work.
+
+        Args:
+            session_id (str): From the response to the session's first call,
+                or None to start a new session
+            revision (int): Must be higher than in every earlier call of the session
+            text (str): The client's whole current text
+            use_nmt (bool): Whether NMT may be used; see translate_async()
+            timeout (float): Seconds to give up after, or None for no limit
+            pair (str): The language pair, or None for the default pair; a
+                session that switches pairs starts over
+
+        Returns:
+            dict: The translation result, plus "session_id", "sentence_count"
+            and "retranslated", the indexes of the sentences translated in this call
+
+        Raises:
+            UnsupportedPair: If the pair is not configured
+            Superseded: If a newer revision arrived before or during this call
+            SessionClosed: If the session was closed, expired or evicted during this call
+            Overloaded: If a queue is full or the timeout passed
+        """
+        engine = await self._engine(pair)
+        session = self.sessions.get(session_id or self.sessions.new_id())
+        if revision <= session.revision:
+            raise Superseded(f"Revision {revision} is not newer than revision {session.revision}")
+        session.revision = revision
+
+        # The running call is translating text the client has already changed
+        if session.task is not None and not session.task.done():
+            session.task.cancel()
+        task = session.task = asyncio.ensure_future(self._translate_incremental(session, text, use_nmt, engine))
+
+        try:
+            return {**await asyncio.wait_for(task, timeout), "session_id": session.session_id}
+        except asyncio.CancelledError:
+            if session.closed:
+                raise SessionClosed(f"Session {session.session_id} was closed during revision {revision}")
+            if session.revision != revision:
+                raise Superseded(f"Revision {revision} was superseded by revision {session.revision}")
+            # The caller itself was cancelled
+            raise
+        except asyncio.TimeoutError:
+            raise self._timed_out(timeout, engine)
+
+    async def _translate_incremental(self, session, text, use_nmt, engine):
+        """Translate the sentences of text missing from the session and combine them with the rest"""
+        spans = self.segmenter.segment(text)
+        if not spans:
+            session.sentences = {}
+            result = await self._translate_async(text, use_nmt, engine)
+            return {**result, "sentence_count": 0, "retranslated": []}
+
+        sentences = [text[start:end] for start, end in spans]
+        # Results of another pair, lexicon or NMT choice cannot be reused
+        settings = (engine.name, engine.lexicons.current.version if engine.lexicons is not None else None, use_nmt)
+        previous = session.sentences if session.settings == settings else {}
+        missing = list(dict.fromkeys(sentence for sentence in sentences if sentence not in previous))
+
+        # Each sentence is routed on its own, so an edit never sends the
+        # whole text to NMT just because one sentence needs it
+        translated = await asyncio.gather(*[self._translate_async(sentence, use_nmt, engine) for sentence in missing])
+
+        # Sentences no longer in the text are dropped from the session
+        current = {sentence: previous[sentence] for sentence in sentences if sentence in previous}
+        current.update(zip(missing, translated))
+        session.sentences = current
+        session.settings = settings
+
+        results = [current[sentence] for sentence in sentences]
+        errors = [result["error"] for result in results if result["error"]]
+        engines = {result["model_used"] for result in results}
+        confidences = [result["confidence"] for result in results if result.get("confidence") is not None]
+        retranslated = set(missing)
+
+        return {
+            "success": all(result["success"] for result in results),
+            "translation": self.segmenter.stitch(
+                text, spans, [result["translation"] or sentence for sentence, result in zip(sentences, results)]
+            ),
+            "error": "; ".join(errors) or None,
+            "sentences": [ir for result in results for ir in result["sentences"]],
+            "model_used": engines.pop() if len(engines) == 1 else "mixed",
+            "confidence": min(confidences) if confidences else None,
+            "sentence_count": len(sentences),
+            "retranslated": [i for i, sentence in enumerate(sentences) if sentence in retranslated]
+        }
+
+    async def translate_many(self, items):
+        """
+        Translate a batch of texts, yielding results as they finish
+
+        NMT items are queued on the micro-batcher two batches ahead so they
+        are sent to the model in full batches, while rule-based items
+        (including the ones the router keeps on the rule engine) are
+        translated in one pass in the meantime and yielded as each one is
+        done, so the response starts with the first of them. The batch
+        waits for room in the queues rather than being turned away.
+
+        Args:
+            items (list): (text, use_nmt, pair) triples; pair is None for the default pair
+
+        Yields:
+            tuple: (index into items, translation result), in completion order
+
+        Raises:
+            UnsupportedPair: If a pair is not configured
+        """
+        # A batch keeps at most two micro-batches of its texts queued for
+        # NMT, so single requests still find room in the queue
+        slots = asyncio.Semaphore(config.NMT_BATCH_SIZE * 2)
+
+        async def run_nmt(index, text, engine, scored):
+            async with slots:
+                result = await self._translate_nmt(text, engine, wait=True)
+                return index, await self._from_nmt(text, result, engine, scored, admit=False)
+
+        nmt_tasks = []
+        try:
+            for index, (text, use_nmt, pair) in enumerate(items):
+                # Let other requests in between stretches of rule-based work
+                if index % 64 == 63:
+                    await asyncio.sleep(0)
+
+                engine = await self._engine(pair)
+
+                # The batch was admitted as a whole, so its items wait for room
+                if not use_nmt:
+                    yield index, await self._rule_based(text, engine, admit=False)
+                    continue
+
+                chosen, scored = await self._route_async(text, engine, admit=False)
+                if chosen == "rule-based":
+                    yield index, scored
+                else:
+                    nmt_tasks.append(asyncio.create_task(run_nmt(index, text, engine, scored)))
+
+            for task in asyncio.as_completed(nmt_tasks):
+                yield await task
+        finally:
+            # Stop queued work if the caller goes away early
+            for task in nmt_tasks:
+                task.cancel()
+
+    async def start(self, eager=True):
+        """
+        Finish startup work, then mark the pipeline as ready
+
+        Args:
+            eager (bool): Load the NMT model and run the warm-up batch now,
+                instead of on the first NMT request
+        """
+        # Start warm from the results earlier processes left behind
+        if self.cache.path:
+            await asyncio.to_thread(self.cache.load)
+        if eager:
+            await asyncio.to_thread(self.warm_up)
+        self.ready = True
+
+    def preload(self):
+        """
+        Load the NMT model weights without running them
+
+        Used by the pre-forking launcher before workers are forked. Running
+        the model starts torch thread pools, which must not be forked, so the
+        warm-up batch is left to each worker.
+        """
+        try:
+            self.engines.default.nmt._load_model()
+        except RuntimeError:
+            # Requests will fall back to the rule-based engine
+            pass
+
+    def warm_up(self, texts=None):
+        """
+        Load the default pair's NMT model and translate a warm-up batch with both engines
+
+        A model that fails to load is not fatal; requests fall back to
+        the rule-based engine.
+        """
+        texts = texts or config.NMT_WARMUP_TEXTS
+
+        for text in texts:
+            self.translate_rule_based(text)
+
+        self.warmed_up = self.engines.default.nmt.warm_up(texts)
+        return self.warmed_up
+
+    def status(self):
+        """Describe the readiness of the pipeline; the lexicon and NMT fields are the default pair's"""
+        default = self.engines.default
+        return {
+            "ready": self.ready,
+            "lexicon_entries": len(default.lexicons.current.lexicon) if default.lexicons is not None else 0,
+            "lexicon": default.lexicons.status() if default.lexicons is not None else None,
+            "nmt": default.nmt.status,
+            "warmed_up": self.warmed_up,
+            "routing": self.router.stats(),
+            "pairs": self.engines.status()
+        }
+
+    def metrics(self):
+        """
+        Collect the stage histograms and the cache, batching, routing and
+        lexicon counters, for /metrics
+
+        Returns:
+            list: Metric families; see compiler.metrics.render()
+        """
+        stages = []
+        requests = []
+        for (stage, engine), histogram in sorted(METRICS.snapshot().items()):
+            if stage == "request":
+                requests.append(({"engine": engine}, histogram))
+            else:
+                stages.append(({"stage": stage, "engine": engine}, histogram))
+
+        cache = self.cache.stats()
+        routing = self.router.stats()
+        engines = self.engines.all()
+        lexicons = [(engine.name, engine.lexicons.status()) for engine in engines if engine.lexicons is not None]
+
+        return [
+            ("smartlang_stage_duration_seconds", "histogram",
+             "Time spent in each translation stage", stages),
+            ("smartlang_request_duration_seconds", "histogram",
+             "Time to serve a /api/translate request, by the engine that answered", requests),
+            ("smartlang_cache_hits_total", "counter", "Translation cache hits", [({}, cache["hits"])]),
+            ("smartlang_cache_misses_total", "counter", "Translation cache misses", [({}, cache["misses"])]),
+            ("smartlang_cache_evictions_total", "counter",
+             "Entries evicted to stay within the cache budget", [({}, cache["evictions"])]),
+            ("smartlang_cache_expirations_total", "counter",
+             "Entries dropped after their time-to-live", [({}, cache["expirations"])]),
+            ("smartlang_cache_entries", "gauge", "Entries in the in-memory cache", [({}, cache["entries"])]),
+            ("smartlang_cache_bytes", "gauge", "Approximate size of the in-memory cache", [({}, cache["bytes"])]),
+            ("smartlang_nmt_batches_total", "counter", "Generate calls made by the micro-batcher",
+             [({"pair": engine.name}, engine.batcher.batches) for engine in engines]),
+            ("smartlang_nmt_batch_size", "histogram", "Texts per micro-batch",
+             [({"pair": engine.name}, engine.batcher.batch_sizes) for engine in engines]),
+            ("smartlang_nmt_queue_depth", "gauge", "Texts waiting for a micro-batch",
+             [({"pair": engine.name}, engine.batcher.queue_depth()) for engine in engines]),
+            ("smartlang_rule_pool_pending", "gauge",
+             "Long texts running or waiting in the rule-based worker pool", [({}, self.rule_executor.pending)]),
+            ("smartlang_rejected_total", "counter", "Texts turned away because a queue was full",
+             [({"queue": "nmt"}, sum(engine.batcher.rejected for engine in engines)),
+              ({"queue": "rule-based"}, self.rule_executor.rejected)]),
+            ("smartlang_request_timeouts_total", "counter",
+             "Requests given up on after the request timeout", [({}, self.timeouts)]),
+            ("smartlang_sessions", "gauge", "Type-as-you-go sessions kept", [({}, len(self.sessions))]),
+            ("smartlang_nmt_model_loaded", "gauge", "Whether the NMT model of a language pair is loaded",
+             [({"pair": engine.name}, engine.nmt.status == "loaded") for engine in engines]),
+            ("smartlang_nmt_model_evictions_total", "counter",
+             "NMT models unloaded to stay within the model limit or after idling", [({}, self.engines.evictions)]),
+            ("smartlang_routing_decisions_total", "counter", "Texts routed to each engine",
+             [({"engine": engine}, count) for engine, count in routing["decisions"].items()]),
+            ("smartlang_lexicon_entries", "gauge", "Words in the current lexicon", [
+                ({"pair": pair, "version": lexicon["version"], "format": lexicon["lexicon_format"]}, lexicon["lexicon_entries"])
+                for pair, lexicon in lexicons
+            ]),
+            ("smartlang_lexicon_reloads_total", "counter", "Lexicon reloads swapped in",
+             [({"pair": pair}, lexicon["reloads"]) for pair, lexicon in lexicons]),
+            ("smartlang_ready", "gauge", "Whether startup has finished", [({}, self.ready)])
+        ]
+
+    def reload_lexicon(self, force=False, pair=None):
+        """
+        Rebuild a pair's lexicon from the data files and swap it in
+
+        Requests already running finish with the lexicon they started
+        with. Only the cached rule-based results of the old lexicon are
+        dropped; NMT results stay cached. Blocking; call it from a thread.
+
+        Args:
+            force (bool): Accept a lexicon that lost more than half of its entries
+            pair (str): The language pair, or None for the default pair
+
+        Returns:
+            dict: Whether a new lexicon was swapped in, its version and size,
+            and how many cached results were invalidated
+
+        Raises:
+            UnsupportedPair: If the pair is not configured
+            ValueError: If the pair has no lexicon, or the new data fails to
+            build or validate; the current lexicon is kept
+        """
+        engine = self.engines.get(pair)
+        if engine.lexicons is None:
+            raise ValueError(f"{engine.name} has no rule-based lexicon")
+
+        previous, current = engine.lexicons.reload(force=force)
+
+        # The same version in a new format translates the same way
+        invalidated = 0
+        if current.version != previous.version:
+            invalidated = self.cache.invalidate("rule-based", previous.version)
+
+        return {
+            "pair": engine.name,
+            "reloaded": current is not previous,
+            "previous_version": previous.version,
+            **current.describe(),
+            "invalidated": invalidated
+        }
+
+    async def watch_lexicon(self, interval):
+        """
+        Reload a pair's lexicon whenever one of its data files changes
+
+        Polls the files' modification times every interval seconds, for
+        every pair built so far. A change that fails validation is
+        reported and skipped until the files change again.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            for engine in self.engines.all():
+                if engine.lexicons is None or not engine.lexicons.changed():
+                    continue
+
+                try:
+                    result = await asyncio.to_thread(self.reload_lexicon, pair=engine.name)
+                    if result["reloaded"]:
+                        print(f"Reloaded {engine.name} lexicon {result['previous_version']} -> {result['version']}")
+                except ValueError as e:
+                    print(f"Error reloading {engine.name} lexicon: {str(e)}")
+
+    async def evict_idle_models(self, interval):
+        """Unload the NMT models of pairs left unused, checking every interval seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            unloaded = self.engines.evict_idle()
+            if unloaded:
+                print(f"Unloaded idle NMT models: {', '.join(unloaded)}")
+
+    async def persist_cache(self, interval):
+        """Write new cache entries to the persistent tier every interval seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.cache.flush)
+
+    async def close(self):
+        """Release background resources held by the pipeline"""
+        for engine in self.engines.all():
+            await engine.batcher.close()
+        self.rule_executor.shutdown()
+        await asyncio.to_thread(self.cache.close)
+
+    def serialize(self, result, include=None):
+        """
+        Turn a translation result into the API response fields
+
+        The token list and parse tree are only built when asked for; the
+        phrase structure itself is only computed here, for parse trees.
+
+        Args:
+            result (dict): A result from one of the translate methods
+            include (set): Optional fields to return ("translation", "tokens",
+                "parse_tree"), or None for all of them
+
+        Returns:
+            dict: success, error and model_used, plus the requested fields
+        """
+        response = {
+            "success": result["success"],
+            "error": result["error"],
+            "model_used": result["model_used"]
+        }
+        if result.get("confidence") is not None:
+            response["confidence"] = result["confidence"]
+
+        if include is None or "translation" in include:
+            response["translation"] = result["translation"]
+
+        want_tokens = include is None or "tokens" in include
+        want_tree = include is None or "parse_tree" in include
+        if not (want_tokens or want_tree):
+            return response
+
+        sentences = [SentenceIR.from_json(sentence) for sentence in result["sentences"]]
+
+        if want_tokens:
+            response["tokens"] = [token for sentence in sentences for token in sentence.token_dicts()]
+
+        if want_tree:
+            trees = []
+            for sentence in sentences:
+                if sentence.phrases is None:
+                    self.parser.annotate(sentence)
+                trees.append(sentence.parse_tree())
+
+            if not trees:
+                response["parseTree"] = None
+            elif len(trees) == 1:
+                response["parseTree"] = trees[0]
+            else:
+                response["parseTree"] = {
+                    "type": "DOCUMENT",
+                    "is_valid": all(sentence.is_valid for sentence in sentences),
+                    "children": trees
+                }
+
+        return response
+
+    @staticmethod
+    def _corrections():
+        """Read the corrections from accepted error reports, for the phrase table"""
+        store = ReportStore(config.REPORTS_DB_PATH)
+        try:
+            return store.corrections()
+        except sqlite3.Error as e:
+            # Not fatal; the phrase table on its own still works
+            print(f"Error loading corrections from error reports: {str(e)}")
+            return []
+        finally:
+            store.close()
+
+    async def _engine(self, pair):
+        """
+        Return the engine of a pair from the event loop
+
+        A pair asked for the first time is built in a thread, since that
+        reads its lexicon files.
+        """
+        engine = self.engines.find(pair)
+        if engine is not None:
+            return engine
+        return await asyncio.to_thread(self.engines.get, pair)
+
+    async def _route_async(self, text, engine, admit=True):
+        """
+        Choose the engine for a text that may use NMT, translating long texts in the worker pool
+
+        Returns:
+            tuple: ("rule-based" or "nmt", the scored rule-based result or
+            None when routing is off)
+        """
+        if not self.router.enabled:
+            return "nmt", None
+
+        result = await self._rule_based(text, engine, admit)
+        return self.router.choose(result), result
+
+    async def _rule_based(self, text, engine, admit=True):
+        """
+        Translate text with the rule engine from the event loop
+
+        Short texts are translated directly; long ones in the worker pool.
+
+        Raises:
+            Overloaded: If the pool's queue is full and admit is True
+        """
+        if len(text) <= config.RULE_INLINE_CHARS:
+            return self._translate_rule_based(text, engine)
+        return await self.rule_executor.run(self._translate_rule_based, text, engine, admit=admit)
+
+    def _timed_out(self, timeout, engine):
+        """Count a request given up on, and build the error for it"""
+        self.timeouts += 1
+        return Overloaded(
+            f"Translation did not finish within {timeout:g} seconds",
+            retry_after=engine.batcher.retry_after()
+        )
+
+    @staticmethod
+    def _confidence(scored):
+        return scored["confidence"] if scored is not None else None
+
+    def _nmt_spans(self, text):
+        """Split text into sentence chunks short enough for the model"""
+        return self.segmenter.segment(text, max_words=config.SEGMENT_MAX_WORDS) or [(0, len(text))]
+
+    def _stitch_nmt(self, text, spans, results):
+        """Combine per-segment NMT results into one result for the whole text"""
+        for result in results:
+            if not result["success"]:
+                return result
+
+        return {
+            "success": True,
+            "translation": self.segmenter.stitch(text, spans, [result["translation"] for result in results]),
+            "model": "nmt"
+        }
+
+    def _nmt_key(self, text, engine):
+        # The model is case-sensitive, so only whitespace is normalized here
+        return self.cache.key("nmt", engine.nmt.model_name, " ".join(text.split()))
+
+    async def _translate_nmt(self, text, engine, wait=False):
+        """
+        Translate text with NMT
+
+        The text is split into sentence chunks, which the micro-batcher
+        sends to the model together, and the translations are stitched back.
+
+        Args:
+            wait (bool): Wait for room in the batcher's queue instead of
+                raising Overloaded when it is full
+        """
+        spans = self._nmt_spans(text)
+        results = await asyncio.gather(*[
+            self._translate_nmt_segment(text[start:end], engine, wait) for start, end in spans
+        ])
+        return self._stitch_nmt(text, spans, results)
+
+    async def _translate_nmt_segment(self, text, engine, wait=False):
+        """Translate one sentence chunk with NMT, serving repeats from the cache"""
+        key = self._nmt_key(text, engine)
+        result = await self.cache.fetch(key)
+        if result is None:
+            self.engines.use(engine)
+            result = await engine.batcher.translate(text, wait=wait)
+            if result["success"]:
+                self.cache.put(key, result)
+        return result
+
+    async def _from_nmt(self, text, result, engine, scored=None, admit=True):
+        """
+        Build the response for an NMT result, falling back to rule-based on failure
+
+        Args:
+            text (str): The translated text
+            result (dict): The stitched NMT result
+            engine (Engine): The language pair's engine
+            scored (dict): The rule-based result routing scored text with, if it did
+            admit (bool): See _rule_based()
+        """
+        if result["success"]:
+            return {
+                "success": True,
+                "translation": result["translation"],
+                "error": None,
+                "sentences": [],
+                "model_used": "nmt",
+                "confidence": self._confidence(scored)
+            }
+
+        # Fall back to the rule-based approach if NMT fails, reusing the
+        # translation routing already made; long texts go to the worker pool
+        fallback = scored if scored is not None else await self._rule_based(text, engine, admit)
+        if not fallback["success"]:
+            # Cached results are shared, so build a new dict rather than editing it
+            fallback = {**fallback, "error": f"{result['error']}; {fallback['error']}"}
+        return fallback
@@ -0,0 +1,110 @@
+import re
+import threading
+
+class Router:
+    # Phrase sequences the rule engine handles well: a simple clause with one
+    # verb phrase, or a bare noun phrase such as a greeting or a title
+    PATTERN_RE = re.compile(
+        r"^(NOUN_PHRASE )?VERB_PHRASE( (NOUN_PHRASE|ADJECTIVE_PHRASE|PREPOSITIONAL_PHRASE))*$"
+        r"|^(ADJECTIVE_PHRASE )?NOUN_PHRASE( ADJECTIVE_PHRASE)?$"
+    )
+
+    # Confidence is scaled by this much when the sentence pattern is not recognized
+    UNRECOGNIZED_PENALTY = 0.5
+
+    def __init__(self, parser, threshold=0.9, max_words=12, enabled=True):
+        """
+        Decide which engine should translate a text
+
+        The rule engine is cheap but only reliable for short sentences made
+        of words it knows, so each sentence gets a confidence score from its
+        tokenizer output and only texts below the threshold go to NMT.
+
+        Args:
+            parser (Parser): Used to check the sentence pattern
+            threshold (float): Lowest confidence served by the rule engine
+            max_words (int): Longest sentence served by the rule engine
+            enabled (bool): Route at all; when off, callers' use_nmt decides alone
+        """
+        self.parser = parser
+        self.threshold = threshold
+        self.max_words = max_words
+        self.enabled = enabled
+
+        self.decisions = {"rule-based": 0, "nmt": 0}
+        self._lock = threading.Lock()
+
+    def score(self, sentence, lexicon, phrases):
+        """
+        Score how well the rule engine can translate a sentence
+
+        Args:
+            sentence (SentenceIR): The tokenized sentence
+            lexicon (Lexicon): Word translations; a word only counts as known
+                when the lexicon translates it to something other than itself,
+                since most listed words have no translation and would be
+                copied into the output in English
+            phrases (PhraseTable): Phrase memory; words it covers count as known
+
+        Returns:
+            float: Confidence between 0 and 1
+        """
+        if not sentence.is_valid:
+            return 0.0
+
+        values, types = sentence.values, sentence.types
+
+        covered = [False] * len(values)
+        for start, end, _ in phrases.matches(values):
+            covered[start:end] = [True] * (end - start)
+
+        words = 0
+        known = 0
+        # Token types outside phrase hits, for the pattern check
+        remaining = []
+        for value, token_type, in_phrase in zip(values, types, covered):
+            if token_type == "PUNCTUATION":
+                continue
+            words += 1
+            if in_phrase:
+                known += 1
+            else:
+                remaining.append(token_type)
+                if lexicon.translate(value, token_type) != value:
+                    known += 1
+
+        # Long sentences are beyond what the grammar rules can handle
+        if words > self.max_words:
+            return 0.0
+
+        confidence = known / words
+        if remaining and not self.PATTERN_RE.match(" ".join(
+            str(phrase_type) for phrase_type in self.parser.phrase_sequence(remaining)
+        )):
+            confidence *= self.UNRECOGNIZED_PENALTY
+
+        return round(confidence, 3)
+
+    def choose(self, result):
+        """
+        Pick the engine for a text from its rule-based translation, and count the decision
+
+        Returns:
+            str: "rule-based" to keep the result, or "nmt"
+        """
+        confident = result["success"] and result.get("confidence", 0.0) >= self.threshold
+        engine = "rule-based" if confident else "nmt"
+
+        with self._lock:
+            self.decisions[engine] += 1
+        return engine
+
+    def stats(self):
+        """Return the routing settings and how many texts went to each engine"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "max_words": self.max_words,
+                "decisions": dict(self.decisions)
+            }
@@ -0,0 +1,118 @@
+import re
+
+class Segmenter:
+    # Sentence-final punctuation (with any closing quotes or brackets) followed
+    # by whitespace, or a line break
+    BOUNDARY_RE = re.compile(r'[.!?]+["\')\]]*(?=\s|$)|\n')
+    WORD_RE = re.compile(r'\S+')
+
+    # Words whose trailing period does not end a sentence
+    ABBREVIATIONS = frozenset({
+        "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e"
+    })
+
+    # Punctuation a long sentence is preferably split after
+    CLAUSE_ENDINGS = (",", ";", ":")
+
+    def segment(self, text, max_words=None):
+        """
+        Split text into sentences, and optionally into chunks of bounded length
+
+        Args:
+            text (str): The text to split
+            max_words (int): Longest chunk, in words; longer sentences are split
+                at clause punctuation or word boundaries. None keeps whole sentences.
+
+        Returns:
+            list: (start, end) character spans into text, in order. The text
+            between spans is whitespace only.
+        """
+        spans = []
+        start = 0
+
+        for match in self.BOUNDARY_RE.finditer(text):
+            end = match.end()
+            if match.group() != "\n" and self._is_abbreviation(text, start, match.start()):
+                continue
+            self._add_span(text, spans, start, end)
+            start = end
+
+        self._add_span(text, spans, start, len(text))
+
+        # Leading punctuation with no words belongs to the first sentence
+        if len(spans) > 1 and not any(c.isalnum() for c in text[spans[0][0]:spans[0][1]]):
+            spans[:2] = [(spans[0][0], spans[1][1])]
+
+        if max_words:
+            spans = [chunk for span in spans for chunk in self._chunk(text, span, max_words)]
+
+        return spans
+
+    @staticmethod
+    def stitch(text, spans, translations):
+        """
+        Rebuild a text from translated spans, keeping the original whitespace between them
+
+        Args:
+            text (str): The original text
+            spans (list): The spans returned by segment
+            translations (list): One translation per span
+
+        Returns:
+            str: The stitched translation
+        """
+        parts = []
+        position = 0
+
+        for (start, end), translation in zip(spans, translations):
+            parts.append(text[position:start])
+            parts.append(translation)
+            position = end
+
+        parts.append(text[position:])
+        return "".join(parts).strip()
+
+    def _is_abbreviation(self, text, start, period):
+        """Check whether the word before a period is a known abbreviation"""
+        words = text[start:period].split()
+        return bool(words) and text[period] == "." and words[-1].lower() in self.ABBREVIATIONS
+
+    def _add_span(self, text, spans, start, end):
+        # Trim surrounding whitespace so it stays in the gaps between spans
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+
+        if start == end:
+            return
+
+        # Runs of punctuation with no words belong to the previous sentence
+        if spans and not any(c.isalnum() for c in text[start:end]):
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+
+    def _chunk(self, text, span, max_words):
+        """Split a span into chunks of at most max_words words"""
+        words = [match.span() for match in self.WORD_RE.finditer(text, *span)]
+        if len(words) <= max_words:
+            return [span]
+
+        chunks = []
+        first = 0
+
+        while first < len(words):
+            last = min(first + max_words, len(words)) - 1
+
+            # Prefer to cut after a clause, as long as the chunk stays reasonably long
+            if last < len(words) - 1:
+                for i in range(last, first + max_words // 2 - 1, -1):
+                    if text[words[i][1] - 1] in self.CLAUSE_ENDINGS:
+                        last = i
+                        break
+
+            chunks.append((words[first][0], words[last][1]))
+            first = last + 1
+
+        return chunks
@@ -0,0 +1,110 @@
+import secrets
+import time
+from collections import OrderedDict
+
+class Superseded(RuntimeError):
+    """Raised for a session call made pointless by a newer revision of the text"""
+
+class SessionClosed(RuntimeError):
+    """Raised for a session call whose session was closed, expired or evicted while it ran"""
+
+class TranslationSession:
+    __slots__ = ("session_id", "revision", "sentences", "settings", "task", "last_used", "closed")
+
+    def __init__(self, session_id):
+        """
+        State of one type-as-you-go client between calls
+
+        Holds the translation of every sentence in the client's last text,
+        keyed by the sentence itself, so the next call only translates the
+        sentences that are new or were edited.
+        """
+        self.session_id = session_id
+        self.revision = -1
+        # Sentence text -> translation result for it
+        self.sentences = {}
+        # Pair, lexicon version and use_nmt the sentences were translated
+        # with; changing any of them, e.g. by a reload, starts over
+        self.settings = None
+        # The call currently translating for this session, if any
+        self.task = None
+        self.last_used = time.monotonic()
+        # Set once the store forgets the session
+        self.closed = False
+
+class SessionStore:
+    def __init__(self, max_sessions=1000, idle_seconds=600):
+        """
+        Bounded set of incremental translation sessions
+
+        Sessions idle for longer than idle_seconds are forgotten, and the
+        least recently used ones go first beyond max_sessions. A forgotten
+        session is simply started again; it only costs re-translating the
+        client's text once. Only touched on the event loop.
+
+        Args:
+            max_sessions (int): Most sessions kept at once
+            idle_seconds (float): How long an unused session is kept
+        """
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    @staticmethod
+    def new_id():
+        """
+        Return an ID for a new session
+
+        IDs are issued by the server and cannot be guessed, so one client
+        cannot supersede or close another client's session.
+        """
+        return secrets.token_urlsafe(16)
+
+    def get(self, session_id):
+        """Return the session with this ID, starting a new one if needed"""
+        now = time.monotonic()
+        self._expire(now)
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = TranslationSession(session_id)
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                self._cancel(evicted)
+        else:
+            self._sessions.move_to_end(session_id)
+
+        session.last_used = now
+        return session
+
+    def close(self, session_id):
+        """
+        Forget a session and stop its running call
+
+        Returns:
+            bool: Whether the session existed
+        """
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._cancel(session)
+        return True
+
+    def _expire(self, now):
+        # Least recently used first, so stop at the first session still in use
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used <= self.idle_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self._cancel(session)
+
+    @staticmethod
+    def _cancel(session):
+        # Tells the running call why it was cancelled
+        session.closed = True
+        if session.task is not None and not session.task.done():
+            session.task.cancel()
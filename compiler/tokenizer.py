@@ -1,48 +1,92 @@
 import re
-import json
-from pathlib import Path
+import time
+from compiler.ir import SentenceIR
+from compiler.lexicon import Lexicon
+from compiler.metrics import METRICS
+
+class Token:
+    """A typed token, much smaller than the equivalent dict"""
+    __slots__ = ("value", "type")
+
+    def __init__(self, value, type):
+        self.value = value
+        self.type = type
+
+    def to_dict(self):
+        """Return the token in the JSON shape used by the API"""
+        return {"value": self.value, "type": self.type}
+
+    def __eq__(self, other):
+        return isinstance(other, Token) and self.value == other.value and self.type == other.type
+
+    def __repr__(self):
+        return f"Token({self.value!r}, {self.type!r})"
+
+class _TokenTypes(dict):
+    """
+    Word -> token type table used by the tokenizer
+
+    Words not in the table are resolved by __missing__: looked up in a
+    memory-mapped lexicon and remembered, or otherwise guessed.
+    """
+    __slots__ = ("lexicon", "limit", "seed")
+
+    def __init__(self, seed, lexicon=None, limit=65536):
+        super().__init__(seed)
+        # Kept to restore the table when it is reset; only needed for a mapped lexicon
+        self.seed = dict(seed) if lexicon is not None else None
+        # Only set for a memory-mapped lexicon, whose words are not all in the table
+        self.lexicon = lexicon
+        self.limit = limit
+
+    def __missing__(self, token):
+        entry = self.lexicon.lookup(token) if self.lexicon is not None else None
+        if entry is not None:
+            token_type = entry[0]
+        else:
+            # If word is not in dictionary, try to guess its type
+            # This helps with names and unknown words: a word we don't know
+            # is assumed to be a noun
+            token_type = "NOUN" if token.isalpha() else "UNKNOWN"
+
+        if self.lexicon is not None:
+            if len(self) >= self.limit:
+                self.clear()
+                self.update(self.seed)
+            self[token] = token_type
+        return token_type
 
 class Tokenizer:
-    def __init__(self):
-        # Load the English tokens dictionary
-        data_dir = Path(__file__).parent.parent / "data"
-        with open(data_dir / "english_tokens.json", "r") as f:
-            self.english_tokens = json.load(f)
-            
-        # Add common greeting words
-        self.english_tokens["pronouns"].update({
-            "hi": "hi",
-            "hello": "hello",
-            "hey": "hey",
-            "how": "how",
-            "what": "what",
-            "when": "when",
-            "where": "where",
-            "why": "why",
-            "who": "who"
-        })
+    # Split into words and punctuation
+    # This regex splits on whitespace and keeps punctuation
+    TOKEN_RE = re.compile(r'\b\w+\b|\S')
+    
+    PUNCTUATION = ".,;:?!"
+
+    def __init__(self, lexicon=None):
+        # Share the compiled lexicon with the generator when one is given
+        self.lexicon = lexicon if lexicon is not None else Lexicon.load()
         
-        # Add common name-related words
-        self.english_tokens["nouns"].update({
-            "name": "name",
-            "person": "person",
-            "people": "people",
-            "day": "day",
-            "time": "time",
-            "world": "world",
-            "life": "life",
-            "work": "work",
-            "home": "home",
-            "family": "family",
-            "love": "love",
-            "hate": "hate",
-            "hope": "hope",
-            "dream": "dream",
-            "future": "future",
-            "past": "past",
-            "present": "present"
-        })
+        # Every known word and punctuation mark -> token type, so classifying
+        # a token is a single dict probe. Dictionary words take precedence.
+        # A memory-mapped lexicon is not copied; its words are added as they
+        # are first seen.
+        seed = dict.fromkeys(self.PUNCTUATION, "PUNCTUATION")
+        if self.lexicon.mapped:
+            self.token_types = _TokenTypes(seed, self.lexicon)
+        else:
+            seed.update((word, entry[0]) for word, entry in self.lexicon.entries.items())
+            self.token_types = _TokenTypes(seed)
             
+    @staticmethod
+    def normalize(input_text):
+        """Lower-case the text and collapse runs of whitespace"""
+        return " ".join(input_text.lower().split())
+
+    def classify(self, token):
+        """Return the type of a normalized token"""
+        return self.token_types[token]
+
     def tokenize(self, input_text):
         """
         Break down the input English text into tokens.
@@ -53,42 +97,72 @@ class Tokenizer:
         Returns:
             list: A list of tokens with their types
         """
-        # Clean and normalize the input
-        cleaned_text = input_text.lower().strip()
+        started = time.perf_counter()
+        types = self.token_types
+        tokens = [
+            {"value": token, "type": types[token]}
+            for token in self.TOKEN_RE.findall(self.normalize(input_text))
+        ]
+        METRICS.observe("tokenize", time.perf_counter() - started)
+        return tokens
+
+    def tokenize_ir(self, input_text):
+        """
+        Tokenize text straight into the sentence IR used by the parser and generator
         
-        # Split into words and punctuation
-        # This regex splits on whitespace and keeps punctuation
-        raw_tokens = re.findall(r'\b\w+\b|\S', cleaned_text)
+        Args:
+            input_text (str): The English text to tokenize
+            
+        Returns:
+            SentenceIR: Token value and type arrays, not yet parsed
+        """
+        started = time.perf_counter()
+        types = self.token_types
+        values = self.TOKEN_RE.findall(self.normalize(input_text))
+        sentence = SentenceIR(values, [types[token] for token in values])
+        METRICS.observe("tokenize", time.perf_counter() - started)
+        return sentence
+
+    def tokens(self, input_text):
+        """
+        Tokenize text into compact Token records
+        
+        Args:
+            input_text (str): The English text to tokenize
+            
+        Returns:
+            list: Token records, in order
+        """
+        types = self.token_types
+        return [
+            Token(token, types[token])
+            for token in self.TOKEN_RE.findall(self.normalize(input_text))
+        ]
+
+    def iter_tokens(self, input_text):
+        """
+        Lazily yield Token records, without building the whole list
         
-        tokens = []
-        for token in raw_tokens:
-            # Determine token type
-            if token in self.english_tokens.get("pronouns", {}):
-                token_type = "PRONOUN"
-            elif token in self.english_tokens.get("verbs", {}):
-                token_type = "VERB"
-            elif token in self.english_tokens.get("articles", {}):
-                token_type = "ARTICLE"
-            elif token in self.english_tokens.get("nouns", {}):
-                token_type = "NOUN"
-            elif token in self.english_tokens.get("adjectives", {}):
-                token_type = "ADJECTIVE"
-            elif token in self.english_tokens.get("prepositions", {}):
-                token_type = "PREPOSITION"
-            elif token in ".,;:?!":
-                token_type = "PUNCTUATION"
-            else:
-                # If word is not in dictionary, try to guess its type
-                # This helps with names and unknown words
-                if token.isalpha():
-                    # If it's a word we don't know, assume it's a noun
-                    token_type = "NOUN"
-                else:
-                    token_type = "UNKNOWN"
-                
-            tokens.append({
-                "value": token,
-                "type": token_type
-            })
+        Args:
+            input_text (str): The English text to tokenize
+            
+        Yields:
+            Token: The next token
+        """
+        types = self.token_types
+        for match in self.TOKEN_RE.finditer(self.normalize(input_text)):
+            token = match.group()
+            yield Token(token, types[token])
+
+    def tokenize_many(self, input_texts):
+        """
+        Tokenize a batch of texts
+        
+        Args:
+            input_texts (iterable): English texts
             
-        return tokens 
\ No newline at end of file
+        Returns:
+            list: One list of Token records per input text
+        """
+        tokens = self.tokens
+        return [tokens(text) for text in input_texts]
@@ -0,0 +1,126 @@
+"""
+Runtime settings for the SmartLang server.
+
+Every setting can be overridden with an environment variable of the same
+name prefixed with SMARTLANG_, e.g. SMARTLANG_NMT_BATCH_SIZE=32.
+"""
+
+import os
+from pathlib import Path
+
+def _env(name, default, cast=str):
+    value = os.environ.get(f"SMARTLANG_{name}")
+    return default if value is None else cast(value)
+
+def _bool(value):
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+# NMT micro-batching: how many queued requests go into one generate call,
+# and how long the first request in a batch waits for company
+NMT_BATCH_SIZE = _env("NMT_BATCH_SIZE", 16, int)
+NMT_BATCH_WAIT_MS = _env("NMT_BATCH_WAIT_MS", 10.0, float)
+
+# Texts allowed to wait for an NMT batch (0 for no limit). Beyond that,
+# /api/translate answers 503 with Retry-After instead of queueing them.
+NMT_MAX_QUEUE = _env("NMT_MAX_QUEUE", 256, int)
+
+# Rule-based translation of texts longer than RULE_INLINE_CHARS runs in a
+# pool of RULE_WORKERS threads with room for RULE_MAX_QUEUE waiting texts,
+# so long texts do not hold up the event loop; shorter ones are cheaper to
+# translate directly than to hand to a thread
+RULE_WORKERS = _env("RULE_WORKERS", 2, int)
+RULE_MAX_QUEUE = _env("RULE_MAX_QUEUE", 64, int)
+RULE_INLINE_CHARS = _env("RULE_INLINE_CHARS", 1000, int)
+
+# Longest time /api/translate works on a request before giving up with 503,
+# in seconds (0 for no limit). Queued work of a request that gave up is dropped.
+REQUEST_TIMEOUT_SECONDS = _env("REQUEST_TIMEOUT_SECONDS", 30.0, float)
+
+# Largest number of texts accepted by /api/translate/batch
+BATCH_MAX_ITEMS = _env("BATCH_MAX_ITEMS", 10000, int)
+
+# Translation cache: entry and byte budgets for the in-memory LRU, an optional
+# time-to-live (0 keeps entries until evicted) and an optional SQLite file
+# for a persistent tier shared across restarts
+CACHE_MAX_ENTRIES = _env("CACHE_MAX_ENTRIES", 10000, int)
+CACHE_MAX_BYTES = _env("CACHE_MAX_BYTES", 64 * 1024 * 1024, int)
+CACHE_TTL_SECONDS = _env("CACHE_TTL_SECONDS", 0.0, float)
+CACHE_PATH = _env("CACHE_PATH", "")
+# How often new entries are written to the persistent tier
+CACHE_FLUSH_SECONDS = _env("CACHE_FLUSH_SECONDS", 5.0, float)
+
+# Longest chunk sent to the NMT model, in words. Longer sentences are split
+# so they stay well inside the model's 512-token input limit.
+SEGMENT_MAX_WORDS = _env("SEGMENT_MAX_WORDS", 200, int)
+
+# When to load the NMT model: "eager" loads it and runs a warm-up batch in the
+# background at startup (/ready reports 503 until done); "lazy" loads it on
+# the first NMT request, which keeps startup fast for development
+NMT_LOAD = _env("NMT_LOAD", "eager").lower()
+
+# Sentences translated at startup to warm the model up, separated by "|"
+NMT_WARMUP_TEXTS = _env(
+    "NMT_WARMUP_TEXTS",
+    ["Hello, how are you?", "The small dog runs in the park.", "I will visit Spain next summer to practice my Spanish."],
+    lambda value: [text for text in value.split("|") if text.strip()]
+)
+
+# Language pairs served, each with its Marian model and optional lexicon
+# directory (relative to the file), and the default pair for requests
+# without source/target
+LANGUAGE_PAIRS_PATH = _env("LANGUAGE_PAIRS_PATH", Path(__file__).parent / "data" / "language_pairs.json", Path)
+
+# NMT models kept loaded at once, the default pair's included; using another
+# pair's model unloads the least recently used one. Models of other pairs
+# unused for NMT_IDLE_SECONDS are unloaded too (0 keeps them loaded).
+NMT_MAX_MODELS = _env("NMT_MAX_MODELS", 2, int)
+NMT_IDLE_SECONDS = _env("NMT_IDLE_SECONDS", 1800.0, float)
+
+# After a model fails to load, NMT requests fall back to the rule engine
+# straight away for this long before loading is tried again
+NMT_RETRY_SECONDS = _env("NMT_RETRY_SECONDS", 60.0, float)
+
+# CPU inference profile for the NMT model. All of these are off by default;
+# 0 means "use the torch or model default".
+NMT_QUANTIZE = _env("NMT_QUANTIZE", False, _bool)
+NMT_THREADS = _env("NMT_THREADS", 0, int)
+NMT_NUM_BEAMS = _env("NMT_NUM_BEAMS", 0, int)
+NMT_MAX_NEW_TOKENS = _env("NMT_MAX_NEW_TOKENS", 0, int)
+NMT_GREEDY = _env("NMT_GREEDY", False, _bool)
+
+# Worker processes started by `python main.py`. More than one uses the
+# pre-forking launcher, which shares the preloaded model between workers.
+WORKERS = _env("WORKERS", 1, int)
+
+# Confidence-based routing for requests that allow NMT: texts the rule engine
+# scores at or above ROUTER_THRESHOLD (0-1, from the share of known words,
+# the sentence pattern and phrase hits) are served by the rule engine, and
+# sentences longer than ROUTER_MAX_WORDS always go to NMT
+ROUTING = _env("ROUTING", True, _bool)
+ROUTER_THRESHOLD = _env("ROUTER_THRESHOLD", 0.9, float)
+ROUTER_MAX_WORDS = _env("ROUTER_MAX_WORDS", 12, int)
+
+# Type-as-you-go sessions (/api/translate/session): how many are kept per
+# worker, and how long an idle one is kept before it is forgotten
+SESSION_MAX = _env("SESSION_MAX", 1000, int)
+SESSION_IDLE_SECONDS = _env("SESSION_IDLE_SECONDS", 600.0, float)
+
+# Add the expected translations of error reports a reviewer accepted (with
+# the admin token) to the rule-based translator's phrase table whenever the
+# lexicon is built. Off by default, since it changes what the rule engine serves.
+PHRASE_CORRECTIONS = _env("PHRASE_CORRECTIONS", False, _bool)
+
+# How often to check the data files for changes and reload the lexicon, in
+# seconds (0 turns the watcher off; POST /api/admin/reload-lexicon and
+# SIGHUP still reload)
+LEXICON_WATCH_SECONDS = _env("LEXICON_WATCH_SECONDS", 10.0, float)
+
+# Record per-stage latency histograms for /metrics and per-request timings
+METRICS = _env("METRICS", True, _bool)
+
+# Required in the X-Admin-Token header of admin endpoints; when unset, admin
+# endpoints are disabled
+ADMIN_TOKEN = _env("ADMIN_TOKEN", "")
+
+# SQLite database holding translation error reports
+REPORTS_DB_PATH = _env("REPORTS_DB_PATH", Path(__file__).parent / "data" / "error_reports.db", Path)
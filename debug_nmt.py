@@ -5,19 +5,125 @@ This is useful for troubleshooting model-specific issues.
 
 from compiler.nmt_translator import NMTTranslator
 import argparse
+import multiprocessing
+import os
+import statistics
 import time
 
+# Sentences used by --profile when no text is given
+PROFILE_TEXTS = [
+    "I am happy",
+    "The cat is on the table",
+    "He loves his new blue car",
+    "The teacher wants to go to the city",
+    "Yesterday I went to the store and bought some food",
+    "I will visit Spain next summer to practice my Spanish",
+    "Can you help me translate this document from English to Spanish?",
+    "The weather is beautiful today, I think I will go for a walk"
+]
+
+def rss_mb():
+    """Resident set size of this process in MB"""
+    with open("/proc/self/statm") as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+def profile_variant(options, quantize, texts, repeat):
+    """
+    Load one model variant and time it on the given texts
+
+    Runs in its own process so memory figures are not skewed by the other variant.
+    """
+    rss_before = rss_mb()
+    translator = NMTTranslator(quantize=quantize, **options)
+
+    start_time = time.perf_counter()
+    translator._load_model()
+    load_time = time.perf_counter() - start_time
+    rss_loaded = rss_mb()
+
+    # The first generate call includes one-off setup; keep it out of the numbers
+    translator.translate_batch(texts[:1])
+
+    latencies = []
+    translations = []
+    for _ in range(repeat):
+        for text in texts:
+            start_time = time.perf_counter()
+            result = translator.translate(text)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            translations.append(result.get("translation") or result.get("error"))
+
+    latencies.sort()
+    return {
+        "load_s": load_time,
+        "model_mb": rss_loaded - rss_before,
+        "peak_mb": rss_mb(),
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "translations": translations[:len(texts)]
+    }
+
+def run_profile(args, options):
+    """Compare latency and memory of the fp32 model against the int8-quantized one"""
+    texts = [args.text] if args.text else PROFILE_TEXTS
+    print(f"Profiling {args.model} on {len(texts)} input(s) x {args.repeat} run(s)")
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for label, quantize in (("fp32", False), ("int8", True)):
+        print(f"\nRunning {label}...")
+        with context.Pool(1) as pool:
+            results[label] = pool.apply(profile_variant, (options, quantize, texts, args.repeat))
+
+    print(f"\n{'':6}{'load (s)':>10}{'model (MB)':>12}{'RSS (MB)':>10}{'mean (ms)':>11}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    for label, stats in results.items():
+        print(f"{label:6}{stats['load_s']:>10.2f}{stats['model_mb']:>12.0f}{stats['peak_mb']:>10.0f}"
+              f"{stats['mean_ms']:>11.1f}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}")
+
+    fp32, int8 = results["fp32"], results["int8"]
+    print(f"\nint8 speed-up: {fp32['mean_ms'] / int8['mean_ms']:.2f}x, "
+          f"memory saved: {fp32['model_mb'] - int8['model_mb']:.0f} MB")
+
+    print("\nTranslations (fp32 / int8):")
+    for text, a, b in zip(texts, fp32["translations"], int8["translations"]):
+        marker = " " if a == b else "*"
+        print(f"{marker} {text}\n    {a}\n    {b}")
+
 def main():
     parser = argparse.ArgumentParser(description='Debug the NMT translation model directly')
     parser.add_argument('text', nargs='?', help='Text to translate')
     parser.add_argument('--model', default="Helsinki-NLP/opus-mt-en-es", 
                         help='Hugging Face model name to use')
+    parser.add_argument('--quantize', action='store_true',
+                        help='Use dynamic int8 quantization for the Linear layers (CPU only)')
+    parser.add_argument('--threads', type=int, help='Intra-op thread count for torch')
+    parser.add_argument('--beams', type=int, help='Beam width for generate')
+    parser.add_argument('--max-new-tokens', type=int, help='Longest generated translation')
+    parser.add_argument('--greedy', action='store_true', help='Use greedy decoding')
+    parser.add_argument('--profile', action='store_true',
+                        help='Compare latency and memory of the fp32 and int8-quantized models')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='How many times --profile translates each input')
     
     args = parser.parse_args()
     
+    options = {
+        "model_name": args.model,
+        "num_threads": args.threads,
+        "num_beams": args.beams,
+        "max_new_tokens": args.max_new_tokens,
+        "greedy": args.greedy
+    }
+    
+    if args.profile:
+        run_profile(args, options)
+        return
+    
     # Initialize the NMT translator
     print(f"Initializing NMT translator with model: {args.model}")
-    translator = NMTTranslator(model_name=args.model)
+    translator = NMTTranslator(quantize=args.quantize, **options)
     
     if args.text:
         # Translate a single text
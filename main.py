@@ -1,13 +1,72 @@
+import argparse
+import asyncio
+import signal
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 import os
-from routes import translate, report
+import config
+import prefork
+from compiler.metrics import render
+from compiler.pipeline import TranslationPipeline
+from routes import translate, report, admin
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the token dictionaries once per process instead of once per request.
+    # The pre-forking launcher builds the pipeline before forking workers.
+    pipeline = getattr(app.state, "pipeline", None)
+    if pipeline is None:
+        pipeline = TranslationPipeline()
+        app.state.pipeline = pipeline
+
+    # Load and warm up the model in the background so /ready can answer meanwhile
+    tasks = [asyncio.create_task(pipeline.start(eager=config.NMT_LOAD == "eager"))]
+
+    # Pick up dictionary changes without a restart
+    if config.LEXICON_WATCH_SECONDS > 0:
+        tasks.append(asyncio.create_task(pipeline.watch_lexicon(config.LEXICON_WATCH_SECONDS)))
+
+    # Free the memory of language pairs nobody is using
+    if config.NMT_IDLE_SECONDS > 0:
+        interval = min(60.0, config.NMT_IDLE_SECONDS / 2)
+        tasks.append(asyncio.create_task(pipeline.evict_idle_models(interval)))
+
+    # Write new cache entries to disk off the event loop
+    if pipeline.cache.path:
+        tasks.append(asyncio.create_task(pipeline.persist_cache(config.CACHE_FLUSH_SECONDS)))
+    _reload_on_sighup(pipeline)
+
+    yield
+    for task in tasks:
+        task.cancel()
+    await pipeline.close()
+
+def _reload_on_sighup(pipeline):
+    """Reload the lexicons on SIGHUP, where the platform and event loop allow it"""
+    async def reload():
+        for engine in pipeline.engines.all():
+            if engine.lexicons is None:
+                continue
+            try:
+                result = await asyncio.to_thread(pipeline.reload_lexicon, pair=engine.name)
+                print(f"{engine.name} lexicon version {result['version']} (reloaded: {result['reloaded']})")
+            except ValueError as e:
+                print(f"Error reloading {engine.name} lexicon: {str(e)}")
+
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, lambda: asyncio.create_task(reload()))
+    except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+        # No SIGHUP (Windows), or not running in the main thread
+        pass
 
 app = FastAPI(
     title="SmartLang API",
     description="A compiler-based English to Spanish translation API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for frontend integration
@@ -25,11 +84,41 @@ app.add_middleware(
 # Include API routes with '/api' prefix
 app.include_router(translate.router, prefix="/api")
 app.include_router(report.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to SmartLang API. Use /docs for documentation."}
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until startup (model load and warm-up) is done"""
+    status = app.state.pipeline.status()
+    status["pid"] = os.getpid()
+    status["memory_mb"] = prefork.memory_usage()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Stage latency histograms and cache, batching and routing counters, in
+    the Prometheus text format
+
+    With several workers, each worker reports its own numbers.
+    """
+    return PlainTextResponse(
+        render(app.state.pipeline.metrics()),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the SmartLang API server")
+    parser.add_argument("--workers", type=int, default=config.WORKERS,
+                        help="Number of worker processes sharing one preloaded model")
+    args = parser.parse_args()
+
     port = int(os.environ.get("PORT", 8000))  
-    uvicorn.run("main:app", host="0.0.0.0", port=port)
\ No newline at end of file
+    if args.workers > 1 and hasattr(os, "fork"):
+        prefork.serve(app, host="0.0.0.0", port=port, workers=args.workers)
+    else:
+        uvicorn.run("main:app", host="0.0.0.0", port=port)
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+Pre-forking launcher for running several server workers on one port.
+
+The parent process loads the lexicon and the NMT model weights once, freezes
+them out of the garbage collector's reach and then forks the workers. Pages
+holding the model and lexicon are only ever read, so the workers share them
+copy-on-write instead of each holding its own copy.
+"""
+
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+import uvicorn
+
+# A worker that exits sooner than this after starting counts as crashing
+# on startup; restarts of such workers are delayed, doubling up to the
+# maximum, and the server gives up after CRASH_LIMIT of them in a row
+MIN_UPTIME_SECONDS = 10.0
+RESTART_DELAY_MAX = 30.0
+CRASH_LIMIT = 10
+
+def memory_usage(pid="self"):
+    """
+    Split a process's resident memory into the part it shares with other
+    processes and the part only it uses
+
+    Returns:
+        dict: Sizes in MB (rss, pss, shared, unique), or None where
+        /proc/<pid>/smaps_rollup is not available
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return None
+
+    def mb(*names):
+        return round(sum(fields.get(name, 0) for name in names) / 1024, 1)
+
+    return {
+        "rss": mb("Rss"),
+        "pss": mb("Pss"),
+        "shared": mb("Shared_Clean", "Shared_Dirty"),
+        "unique": mb("Private_Clean", "Private_Dirty")
+    }
+
+def print_memory_report(workers):
+    print(f"{'worker':>10}{'RSS (MB)':>12}{'PSS (MB)':>12}{'shared (MB)':>14}{'unique (MB)':>14}")
+    for pid in [os.getpid()] + sorted(workers):
+        usage = memory_usage(pid)
+        if usage is None:
+            continue
+        label = "parent" if pid == os.getpid() else str(pid)
+        print(f"{label:>10}{usage['rss']:>12}{usage['pss']:>12}{usage['shared']:>14}{usage['unique']:>14}")
+    sys.stdout.flush()
+
+def serve(app, host, port, workers):
+    """
+    Preload the translation pipeline and serve app from several forked workers
+
+    Send SIGUSR1 to the parent to print per-worker memory usage, and
+    SIGHUP to make every worker reload the lexicon.
+    """
+    from compiler.pipeline import TranslationPipeline
+
+    # Collecting during the load would only churn pages we are about to share
+    gc.disable()
+
+    pipeline = TranslationPipeline()
+    pipeline.preload()
+    app.state.pipeline = pipeline
+
+    # Move everything loaded so far into the permanent generation, so the
+    # workers' collectors never write to (and so copy) those pages
+    gc.freeze()
+
+    # Split the CPU cores between workers rather than oversubscribing them,
+    # for the default model and the models of other pairs loaded later
+    nmt = pipeline.engines.default.nmt
+    if not nmt.num_threads:
+        nmt.num_threads = pipeline.engines.nmt_options["num_threads"] = max(1, (os.cpu_count() or 1) // workers)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Worker pid -> when it was started
+    children = {}
+    shutting_down = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(app, sock, pipeline)
+        children[pid] = time.monotonic()
+
+    def forward(signum):
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def stop(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        forward(signal.SIGTERM)
+
+    for _ in range(workers):
+        spawn()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: print_memory_report(children))
+    signal.signal(signal.SIGHUP, lambda signum, frame: forward(signal.SIGHUP))
+
+    print(f"Started {workers} workers on http://{host}:{port} (parent pid {os.getpid()})")
+
+    exit_code = 0
+    crashes = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        started = children.pop(pid, None)
+        if shutting_down:
+            continue
+
+        code = os.waitstatus_to_exitcode(status)
+        if started is not None and time.monotonic() - started < MIN_UPTIME_SECONDS:
+            crashes += 1
+        else:
+            crashes = 0
+
+        if crashes >= CRASH_LIMIT:
+            print(f"Worker {pid} exited with status {code}; {crashes} workers in a row failed on startup, stopping")
+            shutting_down = True
+            exit_code = 1
+            forward(signal.SIGTERM)
+            continue
+
+        # Back off instead of forking as fast as workers can fail
+        delay = min(RESTART_DELAY_MAX, 0.5 * 2 ** (crashes - 1)) if crashes else 0
+        print(f"Worker {pid} exited with status {code}, restarting" + (f" in {delay:g} s" if delay else ""))
+        time.sleep(delay)
+        if not shutting_down:
+            spawn()
+
+    sock.close()
+    if exit_code:
+        sys.exit(exit_code)
+
+def _run_worker(app, sock, pipeline):
+    """Serve requests in a forked worker; never returns"""
+    exit_code = 0
+    try:
+        # New objects in the worker are collected as usual
+        gc.enable()
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1):
+            signal.signal(signum, signal.SIG_DFL)
+        # Until the app installs its lexicon reload handler
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+        # Only when the parent loaded the model, so torch is there and
+        # imported; otherwise the model sets it when it loads
+        nmt = pipeline.engines.default.nmt
+        if nmt.num_threads and nmt.status == "loaded":
+            import torch
+            torch.set_num_threads(nmt.num_threads)
+
+        server = uvicorn.Server(uvicorn.Config(app, lifespan="on"))
+        server.run(sockets=[sock])
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
@@ -0,0 +1,55 @@
+import asyncio
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+
+import config
+from compiler.engines import UnsupportedPair
+from compiler.pipeline import TranslationPipeline
+from routes.translate import get_pipeline
+
+router = APIRouter(
+    tags=["admin"],
+    responses={404: {"description": "Not found"}},
+)
+
+class LexiconReloadResponse(BaseModel):
+    pair: str  # The language pair, e.g. "en-es"
+    reloaded: bool  # False if the data files had not changed
+    version: str
+    previous_version: str
+    lexicon_entries: int
+    phrases: int
+    grammar_rules: int
+    invalidated: int  # Cached rule-based results dropped
+
+def check_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Require the X-Admin-Token header to match SMARTLANG_ADMIN_TOKEN
+
+    Without a configured token, admin endpoints are turned away altogether.
+    """
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set SMARTLANG_ADMIN_TOKEN")
+    if not secrets.compare_digest(x_admin_token or "", config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.post("/admin/reload-lexicon", response_model=LexiconReloadResponse, dependencies=[Depends(check_admin_token)])
+async def reload_lexicon(force: bool = False, pair: Optional[str] = None,
+                         pipeline: TranslationPipeline = Depends(get_pipeline)):
+    """
+    Rebuild the lexicon from the data files and accepted corrections, and swap it in
+
+    The current lexicon is kept if the new one fails validation. Pass
+    force=true to accept a lexicon that lost more than half of its entries,
+    and pair (e.g. "en-es") for another language pair than the default.
+    Only reloads the worker that serves the request; send SIGHUP to the
+    launcher to reload every worker.
+    """
+    try:
+        return await asyncio.to_thread(pipeline.reload_lexicon, force, pair)
+    except UnsupportedPair as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
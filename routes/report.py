@@ -1,66 +1,64 @@
-import json
+import asyncio
 from datetime import datetime
-from pathlib import Path
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
+from typing import List, Literal, Optional
+
+import config
+from routes.admin import check_admin_token
+from storage.report_store import ReportStore
 
 router = APIRouter(
     tags=["feedback"],
     responses={404: {"description": "Not found"}},
 )
 
-# Set up the path for error logs
-ERROR_LOG_PATH = Path(__file__).parent.parent / "data" / "error_reports.json"
-
-# Create the error log file if it doesn't exist
-def initialize_error_log():
-    if not ERROR_LOG_PATH.exists():
-        with open(ERROR_LOG_PATH, "w") as f:
-            json.dump([], f)
+# Error reports are appended to a SQLite database; reports from the old
+# data/error_reports.json file are imported the first time it is opened
+report_store = ReportStore(config.REPORTS_DB_PATH)
 
-# Ensure the error log exists
-initialize_error_log()
+ReportStatus = Literal["pending", "accepted", "rejected", "resolved"]
 
 class ErrorReport(BaseModel):
     original_text: str
     incorrect_translation: str
-    expected_translation: str = None
-    notes: str = None
+    expected_translation: Optional[str] = None
+    notes: Optional[str] = None
 
 class ReportResponse(BaseModel):
     success: bool
     message: str
     report_id: str = None
 
+class StoredReport(ErrorReport):
+    id: str
+    timestamp: str
+    status: ReportStatus
+    reviewed_at: Optional[str] = None  # When a reviewer last set the status
+
+class ReportPage(BaseModel):
+    reports: List[StoredReport]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to get the next page
+
+class StatusUpdate(BaseModel):
+    status: ReportStatus
+
 @router.post("/report-error", response_model=ReportResponse)
 async def report_error(report: ErrorReport):
     """
     Submit a report for an incorrect translation
     """
     try:
-        # Load existing reports
-        with open(ERROR_LOG_PATH, "r") as f:
-            reports = json.load(f)
-        
-        # Create a new report with timestamp and ID
-        timestamp = datetime.now().isoformat()
-        report_id = f"ERR-{len(reports) + 1:04d}"
-        
-        new_report = {
-            "id": report_id,
-            "timestamp": timestamp,
-            "original_text": report.original_text,
-            "incorrect_translation": report.incorrect_translation,
-            "expected_translation": report.expected_translation,
-            "notes": report.notes,
-            "status": "pending"
-        }
-        
-        # Add to reports and save
-        reports.append(new_report)
-        
-        with open(ERROR_LOG_PATH, "w") as f:
-            json.dump(reports, f, indent=2)
+        # Append the report; the store assigns the next ID. SQLite blocks,
+        # so it runs in a thread rather than on the event loop.
+        report_id = await asyncio.to_thread(
+            report_store.add,
+            timestamp=datetime.now().isoformat(),
+            original_text=report.original_text,
+            incorrect_translation=report.incorrect_translation,
+            expected_translation=report.expected_translation,
+            notes=report.notes
+        )
         
         return {
             "success": True,
@@ -72,4 +70,54 @@ async def report_error(report: ErrorReport):
         raise HTTPException(
             status_code=500,
             detail=f"Failed to save error report: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+def _local_isoformat(value):
+    """Format a query time like the stored report timestamps (naive local time)"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat()
+
+@router.get("/reports", response_model=ReportPage, dependencies=[Depends(check_admin_token)])
+async def list_reports(
+    status: Optional[ReportStatus] = None,
+    since: Optional[datetime] = Query(None, description="Only reports submitted at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only reports submitted before this time"),
+    q: Optional[str] = Query(None, description="Only reports whose original text contains this"),
+    cursor: Optional[str] = Query(None, pattern=r"^\d+$", description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """
+    List error reports for triage, newest first
+
+    Requires the admin token; see check_admin_token().
+    """
+    reports, next_cursor = await asyncio.to_thread(
+        report_store.find,
+        status=status,
+        since=_local_isoformat(since),
+        until=_local_isoformat(until),
+        text=q,
+        cursor=cursor,
+        limit=limit
+    )
+
+    return {"reports": reports, "next_cursor": next_cursor}
+
+@router.patch("/reports/{report_id}", response_model=ReportResponse, dependencies=[Depends(check_admin_token)])
+async def update_report(report_id: str, update: StatusUpdate):
+    """
+    Change the status of an error report
+
+    Requires the admin token, since accepted reports can feed the phrase table.
+    """
+    if not await asyncio.to_thread(report_store.update_status, report_id, update.status, datetime.now().isoformat()):
+        raise HTTPException(status_code=404, detail=f"Report {report_id} not found")
+
+    return {
+        "success": True,
+        "message": f"Report status changed to {update.status}",
+        "report_id": report_id
+    }
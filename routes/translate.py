@@ -1,16 +1,49 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, List, Dict, Any, Literal
+
+import config
+from compiler.engines import UnsupportedPair
+from compiler.executor import Overloaded
+from compiler.metrics import METRICS
+from compiler.pipeline import TranslationPipeline
+from compiler.sessions import SessionClosed, Superseded
 
 router = APIRouter(
     tags=["translation"],
     responses={404: {"description": "Not found"}},
 )
 
+# Optional parts of a translation response
+IncludeField = Literal["translation", "tokens", "parse_tree", "timings"]
+
 # Request and Response Models
 class TranslationRequest(BaseModel):
     text: str
     use_nmt: bool = True  # Default to using NMT model
+    include: Optional[List[IncludeField]] = None  # None returns translation, tokens and parse tree
+    source: Optional[str] = None  # Language codes, e.g. "en"; the default pair's when left out
+    target: Optional[str] = None
+
+class BatchTranslationRequest(BaseModel):
+    texts: List[str]
+    use_nmt: bool = True
+    include: Optional[List[IncludeField]] = None
+    source: Optional[str] = None
+    target: Optional[str] = None
+
+class SessionTranslationRequest(BaseModel):
+    # Left out on the first call; after that, the session_id of the first response
+    session_id: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9_-]{22,64}$")
+    revision: int  # Must increase with every call of the session
+    text: str  # The whole current text, not just the edit
+    use_nmt: bool = True
+    include: Optional[List[IncludeField]] = ["translation"]  # Only the translation by default
+    source: Optional[str] = None
+    target: Optional[str] = None
 
 class TranslationResponse(BaseModel):
     original: str
@@ -20,18 +53,208 @@ class TranslationResponse(BaseModel):
     tokens: List[Dict[str, str]] = []  # List of token objects with type and value
     parseTree: Optional[Dict[str, Any]] = None  # Parse tree structure
     model_used: str = "rule-based"  # Either "nmt" or "rule-based"
+    confidence: Optional[float] = None  # Rule engine confidence used for routing (0-1)
+    timings: Optional[Dict[str, float]] = None  # Server-side timings in milliseconds
+
+class SessionTranslationResponse(TranslationResponse):
+    session_id: str
+    revision: int
+    sentence_count: int = 0  # Sentences in the text
+    retranslated: List[int] = []  # Indexes of the sentences translated in this call
+
+def get_pipeline(request: Request) -> TranslationPipeline:
+    """Return the process-wide pipeline built during app startup"""
+    return request.app.state.pipeline
+
+def _response(original, result, include, pipeline, started, stages=None):
+    """
+    Build one response body, with only the requested optional fields
+
+    Fields left out are not sent at all (see response_model_exclude_unset),
+    so a translation-only response skips building and validating the token
+    list and parse tree.
+
+    Args:
+        stages (dict): Seconds spent in each stage, added to the timings
+    """
+    response = {"original": original, **pipeline.serialize(result, include)}
+    if _wants_timings(include):
+        response["timings"] = {
+            "total_ms": _ms(time.perf_counter() - started),
+            **{f"{stage}_ms": _ms(seconds) for stage, seconds in (stages or {}).items()}
+        }
+    return response
 
-@router.post("/translate", response_model=TranslationResponse)
-async def translate(request: TranslationRequest):
+def _include_set(include):
+    return set(include) if include is not None else None
+
+def _wants_timings(include):
+    return include is not None and "timings" in include
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+def _pair(pipeline, source, target):
+    """Name the requested language pair as "source-target", or None for the default pair"""
+    return pipeline.engines.resolve(source, target)
+
+def _unsupported(error):
+    return HTTPException(status_code=400, detail=str(error))
+
+def _unavailable(error):
+    """Turn an Overloaded error into a 503 that tells the client when to retry"""
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+
+@router.post("/translate", response_model=TranslationResponse, response_model_exclude_unset=True)
+async def translate(request: TranslationRequest, pipeline: TranslationPipeline = Depends(get_pipeline)):
     """
     Translate English text to Spanish using a compiler-like approach or NMT
+
+    Pass include (e.g. ["translation"]) to choose the optional response
+    fields; by default the translation, tokens and parse tree are returned.
+    source and target pick another language pair than the default; an
+    unknown pair gets 400. Answers 503 with Retry-After when the server is
+    too busy to take the text or cannot finish it within
+    SMARTLANG_REQUEST_TIMEOUT_SECONDS.
+    """
+    started = time.perf_counter()
+    include = _include_set(request.include)
+
+    # Stage timings are only collected when asked for
+    stages = METRICS.collect() if _wants_timings(include) else None
+    try:
+        result = await pipeline.translate_async(
+            request.text, use_nmt=request.use_nmt, timeout=config.REQUEST_TIMEOUT_SECONDS or None,
+            pair=_pair(pipeline, request.source, request.target)
+        )
+        response = _response(request.text, result, include, pipeline, started, stages)
+    except UnsupportedPair as e:
+        raise _unsupported(e)
+    except Overloaded as e:
+        raise _unavailable(e)
+    finally:
+        if stages is not None:
+            METRICS.stop_collecting()
+
+    METRICS.observe("request", time.perf_counter() - started, engine=result["model_used"])
+    return response
+
+@router.post("/translate/session", response_model=SessionTranslationResponse, response_model_exclude_unset=True)
+async def translate_session(request: SessionTranslationRequest, pipeline: TranslationPipeline = Depends(get_pipeline)):
     """
-    # Dummy implementation for connectivity testing only
+    Translate the latest text of a type-as-you-go client
+
+    The first call leaves out session_id and the server issues one; send
+    it back, with the whole text and a higher revision, after every edit.
+    Only the sentences that changed since the session's previous call are
+    translated. A call overtaken by a newer revision of the same session
+    is dropped and answered with 409, as is a revision that arrives late;
+    one whose session is closed meanwhile is answered with 410.
+    """
+    started = time.perf_counter()
+    include = _include_set(request.include)
+
+    stages = METRICS.collect() if _wants_timings(include) else None
+    try:
+        result = await pipeline.translate_session(
+            request.session_id, request.revision, request.text,
+            use_nmt=request.use_nmt, timeout=config.REQUEST_TIMEOUT_SECONDS or None,
+            pair=_pair(pipeline, request.source, request.target)
+        )
+        response = _response(request.text, result, include, pipeline, started, stages)
+    except UnsupportedPair as e:
+        raise _unsupported(e)
+    except Superseded as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except SessionClosed as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except Overloaded as e:
+        raise _unavailable(e)
+    finally:
+        if stages is not None:
+            METRICS.stop_collecting()
+
+    METRICS.observe("request", time.perf_counter() - started, engine=result["model_used"])
     return {
-        "original": request.text,
-        "translation": request.text[::-1],
-        "success": True,
-        "tokens": [],
-        "parseTree": None,
-        "model_used": "dummy"
+        **response,
+        "session_id": result["session_id"],
+        "revision": request.revision,
+        "sentence_count": result["sentence_count"],
+        "retranslated": result["retranslated"]
     }
+
+@router.delete("/translate/session/{session_id}")
+async def close_session(session_id: str, pipeline: TranslationPipeline = Depends(get_pipeline)):
+    """Forget a session once its client is done, instead of waiting for it to expire"""
+    return {"closed": pipeline.sessions.close(session_id)}
+
+async def _read_batch(request: Request, pipeline: TranslationPipeline):
+    """
+    Read a batch request body as (text, use_nmt, include, pair) items
+
+    Accepts either a JSON BatchTranslationRequest or an NDJSON upload with
+    one TranslationRequest object per line.
+    """
+    body = await request.body()
+
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            items = []
+            for line in body.splitlines():
+                if line.strip():
+                    item = TranslationRequest.model_validate_json(line)
+                    pair = _pair(pipeline, item.source, item.target)
+                    items.append((item.text, item.use_nmt, _include_set(item.include), pair))
+        else:
+            batch = BatchTranslationRequest.model_validate_json(body)
+            include = _include_set(batch.include)
+            pair = _pair(pipeline, batch.source, batch.target)
+            items = [(text, batch.use_nmt, include, pair) for text in batch.texts]
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json()))
+    except UnsupportedPair as e:
+        raise _unsupported(e)
+
+    if len(items) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(items)} items (limit {config.BATCH_MAX_ITEMS})"
+        )
+
+    return items
+
+@router.post("/translate/batch", response_class=StreamingResponse)
+async def translate_batch(request: Request, pipeline: TranslationPipeline = Depends(get_pipeline)):
+    """
+    Translate many texts in one request, streaming NDJSON results
+
+    Each output line is a TranslationResponse with an extra "index" field
+    pointing back into the input, since results are sent as soon as they
+    finish and may arrive out of order. "include" works as for /translate,
+    except that timings only have total_ms, measured from the start of
+    the batch: the items' stages overlap, so they are not broken down.
+
+    A batch is turned away with 400 when it asks for an unknown language
+    pair, and with 503 when the NMT queue of one of its pairs is already
+    full; once accepted, its items wait for room in the queues instead.
+    """
+    started = time.perf_counter()
+    items = await _read_batch(request, pipeline)
+
+    try:
+        # Pairs not built yet have nothing queued
+        engines = [pipeline.engines.find(pair) for pair in {item[3] for item in items}]
+    except UnsupportedPair as e:
+        raise _unsupported(e)
+
+    for engine in engines:
+        if engine is not None and engine.batcher.full():
+            raise _unavailable(Overloaded("The NMT queue is full", retry_after=engine.batcher.retry_after()))
+
+    async def stream():
+        async for index, result in pipeline.translate_many([(text, use_nmt, pair) for text, use_nmt, _, pair in items]):
+            text, _, include, _ = items[index]
+            line = {"index": index, **_response(text, result, include, pipeline, started)}
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,302 @@
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+class ReportStore:
+    def __init__(self, path=DATA_DIR / "error_reports.db", legacy_path=DATA_DIR / "error_reports.json"):
+        """
+        Append-only store for translation error reports
+
+        Reports live in SQLite in WAL mode, so a submission is one indexed
+        insert however many reports exist. Inserts are transactions, so
+        concurrent requests and workers never lose a report or share an ID.
+        IDs come from an AUTOINCREMENT sequence, which never reuses a number.
+
+        Args:
+            path (Path): SQLite database file
+            legacy_path (Path): JSON array written by older versions, imported once
+        """
+        self.path = Path(path)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+
+        # Opened on first use in each process; forked workers get their own
+        self._db = None
+        self._db_pid = None
+        self._lock = threading.Lock()
+
+        # Whether the trigram index for text search exists; SQLite builds
+        # before 3.34 (or without FTS5) fall back to scanning
+        self._text_index = False
+
+    @staticmethod
+    def format_id(seq):
+        return f"ERR-{seq:04d}"
+
+    def add(self, timestamp, original_text, incorrect_translation, expected_translation=None, notes=None,
+            status="pending"):
+        """
+        Append a report and return its new ID
+        """
+        with self._lock:
+            db = self._connection()
+            with db:
+                cursor = db.execute(
+                    "INSERT INTO reports (timestamp, original_text, incorrect_translation, "
+                    "expected_translation, notes, status) VALUES (?, ?, ?, ?, ?, ?)",
+                    (timestamp, original_text, incorrect_translation, expected_translation, notes, status)
+                )
+                report_id = self.format_id(cursor.lastrowid)
+                db.execute("UPDATE reports SET id = ? WHERE seq = ?", (report_id, cursor.lastrowid))
+
+        return report_id
+
+    def find(self, status=None, since=None, until=None, text=None, cursor=None, limit=50):
+        """
+        List reports, newest first, one page at a time
+
+        Pages are keyed on the report sequence number rather than an offset,
+        and status and time filters are served from indexes, so a page costs
+        the same however deep into the log it is. Text searches of three or
+        more characters use a trigram full-text index; shorter ones (and all
+        of them on SQLite builds without the trigram tokenizer) scan the table.
+
+        Args:
+            status (str): Only reports with this status
+            since (str): Only reports with an ISO timestamp at or after this one
+            until (str): Only reports with an ISO timestamp before this one
+            text (str): Only reports whose original text contains this (case-insensitive)
+            cursor (str): next_cursor from the previous page
+            limit (int): Maximum number of reports on the page
+
+        Returns:
+            tuple: (list of report dicts, cursor for the next page or None)
+        """
+        conditions = []
+        params = []
+
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        if text and self._uses_text_index(text):
+            # A quoted phrase matches any text containing it, like LIKE '%text%'
+            conditions.append("seq IN (SELECT rowid FROM reports_text WHERE reports_text MATCH ?)")
+            params.append('"' + text.replace('"', '""') + '"')
+        elif text:
+            escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("original_text LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if cursor is not None:
+            conditions.append("seq < ?")
+            params.append(int(cursor))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT * FROM reports {where} ORDER BY seq DESC LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+
+        # One extra row tells us whether there is another page
+        next_cursor = str(rows[limit - 1]["seq"]) if len(rows) > limit else None
+        reports = [self._to_dict(row) for row in rows[:limit]]
+
+        return reports, next_cursor
+
+    def corrections(self):
+        """
+        Return the expected translations of accepted reports, oldest first
+
+        Only reports accepted by a reviewer through update_status() count;
+        reports imported or created with an accepted status do not.
+
+        Returns:
+            list: (original text, expected translation) pairs
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT original_text, expected_translation FROM reports "
+                "WHERE status = 'accepted' AND reviewed_at IS NOT NULL AND expected_translation IS NOT NULL "
+                "AND expected_translation != '' ORDER BY seq"
+            ).fetchall()
+
+        return [(row["original_text"], row["expected_translation"]) for row in rows]
+
+    def update_status(self, report_id, status, reviewed_at):
+        """
+        Change the status of a report, on behalf of an authenticated reviewer
+
+        Args:
+            reviewed_at (str): ISO timestamp of the review
+
+        Returns:
+            bool: Whether a report with that ID exists
+        """
+        with self._lock:
+            db = self._connection()
+            with db:
+                cursor = db.execute(
+                    "UPDATE reports SET status = ?, reviewed_at = ? WHERE id = ?", (status, reviewed_at, report_id)
+                )
+
+        return cursor.rowcount > 0
+
+    def _uses_text_index(self, text):
+        # Trigrams cannot match fewer than three characters
+        with self._lock:
+            self._connection()
+            return self._text_index and len(text) >= 3
+
+    def close(self):
+        if self._db is not None and self._db_pid == os.getpid():
+            self._db.close()
+        self._db = None
+
+    def _connection(self):
+        # Must be called with the lock held
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db_pid = os.getpid()
+            self._create_schema(self._db)
+        return self._db
+
+    def _create_schema(self, db):
+        with db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS reports ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "id TEXT UNIQUE, "
+                "timestamp TEXT NOT NULL, "
+                "original_text TEXT NOT NULL, "
+                "incorrect_translation TEXT NOT NULL, "
+                "expected_translation TEXT, "
+                "notes TEXT, "
+                "status TEXT NOT NULL DEFAULT 'pending', "
+                "reviewed_at TEXT)"
+            )
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+            # Serve status and time-range listings without scanning the whole log
+            db.execute("CREATE INDEX IF NOT EXISTS reports_status ON reports (status, seq)")
+            db.execute("CREATE INDEX IF NOT EXISTS reports_timestamp ON reports (timestamp)")
+
+        self._text_index = self._create_text_index(db)
+
+        # Databases from before reviews were recorded; their accepted
+        # reports no longer count as corrections until reviewed again
+        columns = {row["name"] for row in db.execute("PRAGMA table_info(reports)")}
+        if "reviewed_at" not in columns:
+            try:
+                db.execute("ALTER TABLE reports ADD COLUMN reviewed_at TEXT")
+            except sqlite3.OperationalError:
+                # Another worker added it first
+                pass
+
+        self._migrate_legacy(db)
+
+    @staticmethod
+    def _create_text_index(db):
+        """
+        Create the trigram index on original_text, and fill it for existing reports
+
+        Returns:
+            bool: Whether the index is available
+        """
+        exists = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'reports_text'").fetchone()
+        try:
+            with db:
+                db.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS reports_text USING fts5("
+                    "original_text, content='reports', content_rowid='seq', tokenize='trigram')"
+                )
+                # Kept in step with the reports table
+                db.execute(
+                    "CREATE TRIGGER IF NOT EXISTS reports_text_insert AFTER INSERT ON reports BEGIN "
+                    "INSERT INTO reports_text (rowid, original_text) VALUES (new.seq, new.original_text); END"
+                )
+                db.execute(
+                    "CREATE TRIGGER IF NOT EXISTS reports_text_delete AFTER DELETE ON reports BEGIN "
+                    "INSERT INTO reports_text (reports_text, rowid, original_text) "
+                    "VALUES ('delete', old.seq, old.original_text); END"
+                )
+                db.execute(
+                    "CREATE TRIGGER IF NOT EXISTS reports_text_update AFTER UPDATE OF original_text ON reports BEGIN "
+                    "INSERT INTO reports_text (reports_text, rowid, original_text) "
+                    "VALUES ('delete', old.seq, old.original_text); "
+                    "INSERT INTO reports_text (rowid, original_text) VALUES (new.seq, new.original_text); END"
+                )
+                if not exists:
+                    db.execute("INSERT INTO reports_text (reports_text) VALUES ('rebuild')")
+        except sqlite3.OperationalError as e:
+            # No FTS5 or no trigram tokenizer in this SQLite build
+            print(f"Report text search will scan the table: {str(e)}")
+            return False
+        return True
+
+    def _migrate_legacy(self, db):
+        """Import the JSON array used by older versions, exactly once"""
+        if self.legacy_path is None or not self.legacy_path.exists():
+            return
+
+        # BEGIN IMMEDIATE takes the write lock, so only one worker imports
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            done = db.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_migrated'").fetchone()
+            if not done:
+                with open(self.legacy_path, "r") as f:
+                    reports = json.load(f)
+
+                # Keep existing IDs. The old len()+1 scheme could hand out the
+                # same ID twice; such duplicates get fresh IDs after the rest.
+                duplicates = []
+                for report in reports:
+                    seq = int(report["id"].rsplit("-", 1)[1])
+                    try:
+                        self._insert_legacy(db, seq, report["id"], report)
+                    except sqlite3.IntegrityError:
+                        duplicates.append(report)
+
+                for report in duplicates:
+                    cursor = self._insert_legacy(db, None, None, report)
+                    db.execute(
+                        "UPDATE reports SET id = ? WHERE seq = ?",
+                        (self.format_id(cursor.lastrowid), cursor.lastrowid)
+                    )
+
+                db.execute(
+                    "INSERT INTO meta (key, value) VALUES ('legacy_json_migrated', ?)",
+                    (str(len(reports)),)
+                )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _to_dict(row):
+        report = dict(row)
+        del report["seq"]
+        return report
+
+    @staticmethod
+    def _insert_legacy(db, seq, report_id, report):
+        return db.execute(
+            "INSERT INTO reports (seq, id, timestamp, original_text, incorrect_translation, "
+            "expected_translation, notes, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (seq, report_id, report["timestamp"], report["original_text"],
+             report["incorrect_translation"], report.get("expected_translation"),
+             report.get("notes"), report.get("status", "pending"))
+        )
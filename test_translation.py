@@ -1,11 +1,39 @@
 import requests
+import asyncio
 import json
+import random
 import time
 import argparse
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Test both the rule-based and NMT translation models
 
+BASE_URL = "http://localhost:8000"
+
+# Test cases - from simple to more complex
+TEST_CASES = [
+    "I am happy",
+    "The cat is on the table",
+    "He loves his new blue car",
+    "I need to speak Spanish fluently",
+    "The teacher wants to go to the city",
+    "The small dog runs in the park",
+    # More complex sentences that might challenge the rule-based system
+    "Yesterday I went to the store and bought some food",
+    "I will visit Spain next summer to practice my Spanish",
+    "Can you help me translate this document from English to Spanish?",
+    "The weather is beautiful today, I think I will go for a walk"
+]
+
+# Sentences with English words the lexicon has no translation for ("table",
+# "small", "park"); the rule engine would copy them into the output, so
+# routing must send them to NMT
+UNTRANSLATED_CASES = [
+    "The cat is on the table",
+    "The small dog runs in the park"
+]
+
 def test_translation(text, use_nmt=True):
     """
     Test the translation API with the given text
@@ -14,7 +42,7 @@ def test_translation(text, use_nmt=True):
         text (str): Text to translate
         use_nmt (bool): Whether to use the NMT model
     """
-    url = "http://localhost:8000/api/translate"
+    url = f"{BASE_URL}/api/translate"
     
     payload = {
         "text": text,
@@ -43,22 +71,68 @@ def test_translation(text, use_nmt=True):
         print(response.text)
         return None
 
+def check_routing():
+    """
+    Check that sentences with untranslated English words are routed to NMT
+    
+    Returns:
+        bool: Whether every sentence went to NMT. The check is skipped, and
+        passes, when the server has routing off or no NMT model loaded.
+    """
+    status = requests.get(f"{BASE_URL}/ready").json()
+    if status.get("nmt") != "loaded" or not status.get("routing", {}).get("enabled"):
+        print("Skipping the routing check: routing is off or the NMT model is not loaded")
+        return True
+    
+    passed = True
+    for text in UNTRANSLATED_CASES:
+        response = requests.post(
+            f"{BASE_URL}/api/translate", json={"text": text, "use_nmt": True, "include": ["translation"]}
+        )
+        model_used = response.json().get("model_used") if response.status_code == 200 else None
+        ok = model_used == "nmt"
+        passed = passed and ok
+        print(f"{'PASS' if ok else 'FAIL'}: {text!r} was translated by {model_used or response.status_code}")
+    return passed
+
+def check_session_close():
+    """
+    Check that closing a session while it is translating answers the running call with 410
+
+    Returns:
+        bool: Whether the running call got 410. The check is skipped, and
+        passes, when the server has no NMT model loaded, since the call
+        would finish before it could be closed; it also passes when the
+        call finished first, as that says nothing about closing.
+    """
+    status = requests.get(f"{BASE_URL}/ready").json()
+    if status.get("nmt") != "loaded":
+        print("Skipping the session check: the NMT model is not loaded")
+        return True
+
+    url = f"{BASE_URL}/api/translate/session"
+    session_id = requests.post(url, json={"revision": 1, "text": "I am happy."}).json()["session_id"]
+
+    # Distinct sentences, so none of them come from the cache
+    text = " ".join(f"{case} number {i}." for i in range(20) for case in TEST_CASES)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        running = pool.submit(
+            requests.post, url, json={"session_id": session_id, "revision": 2, "text": text, "use_nmt": True}
+        )
+        time.sleep(0.2)
+        closed = requests.delete(f"{url}/{session_id}").json().get("closed")
+        status_code = running.result().status_code
+
+    if status_code == 200:
+        print("Inconclusive: the session call finished before the session was closed")
+        return True
+    ok = closed and status_code == 410
+    print(f"{'PASS' if ok else 'FAIL'}: closing a running session answered the call with {status_code}")
+    return ok
+
 def run_test_suite():
     """Run the complete test suite with predefined test cases"""
-    # Test cases - from simple to more complex
-    test_cases = [
-        "I am happy",
-        "The cat is on the table",
-        "He loves his new blue car",
-        "I need to speak Spanish fluently",
-        "The teacher wants to go to the city",
-        "The small dog runs in the park",
-        # More complex sentences that might challenge the rule-based system
-        "Yesterday I went to the store and bought some food",
-        "I will visit Spain next summer to practice my Spanish",
-        "Can you help me translate this document from English to Spanish?",
-        "The weather is beautiful today, I think I will go for a walk"
-    ]
+    test_cases = TEST_CASES
     
     print("=" * 50)
     print("TESTING TRANSLATION SERVICES")
@@ -83,6 +157,169 @@ def run_test_suite():
         print(f"\n\nTest {i+1}:")
         test_translation(test, use_nmt=False)
         time.sleep(0.5)  # Small delay
+    
+    print("\n\n" + "=" * 50)
+    print("CHECKING ROUTING")
+    print("=" * 50)
+    check_routing()
+
+    print("\n\n" + "=" * 50)
+    print("CHECKING SESSIONS")
+    print("=" * 50)
+    check_session_close()
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of a sorted list"""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+def latency_summary(records):
+    """Format p50/p95/p99 of the latencies in records, in milliseconds"""
+    latencies = sorted(record["latency"] for record in records)
+    if not latencies:
+        return "p50      -   p95      -   p99      - ms"
+    return (f"p50 {percentile(latencies, 0.50) * 1000:>6.0f}   p95 {percentile(latencies, 0.95) * 1000:>6.0f}"
+            f"   p99 {percentile(latencies, 0.99) * 1000:>6.0f} ms")
+
+async def send_load_request(client, texts, use_nmt, batch):
+    """
+    Send one /api/translate or /api/translate/batch request
+
+    Returns:
+        tuple: (HTTP status, whether every translation succeeded, engine
+        that answered: the model_used of a single translation, or "batch")
+    """
+    if not batch:
+        response = await client.post("/api/translate", json={"text": texts[0], "use_nmt": use_nmt})
+        if response.status_code != 200:
+            return response.status_code, False, None
+        result = response.json()
+        return response.status_code, result["success"], result["model_used"]
+
+    response = await client.post("/api/translate/batch", json={"texts": texts, "use_nmt": use_nmt})
+    if response.status_code != 200:
+        return response.status_code, False, None
+    lines = [json.loads(line) for line in response.text.splitlines() if line.strip()]
+    return response.status_code, len(lines) == len(texts) and all(line["success"] for line in lines), "batch"
+
+async def report_progress(records, started, interval):
+    """Print throughput, error rate and latency of each interval as the test runs"""
+    reported = 0
+    while True:
+        await asyncio.sleep(interval)
+        # Records are appended in completion order, so the new ones are at the end
+        window = records[reported:]
+        reported += len(window)
+        errors = sum(1 for record in window if not record["ok"])
+        print(f"{time.perf_counter() - started:>6.0f}s {len(window) / interval:>8.1f} req/s"
+              f"   errors {errors / max(len(window), 1):>6.1%}   {latency_summary(window)}")
+
+async def run_load_test(args):
+    """
+    Send concurrent requests for a fixed duration and report how the server holds up
+
+    Each of the concurrency workers sends one request at a time. With a
+    rate, requests are started on a fixed schedule instead, as real clients
+    would send them, and latency is measured from the scheduled start: when
+    the server falls behind, the time a request waited for a free worker
+    counts too.
+    """
+    try:
+        import httpx
+    except ImportError:
+        print("The load test needs httpx: pip install httpx")
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    records = []
+    sent = 0
+    started = time.perf_counter()
+    deadline = started + args.duration
+
+    async def worker(client):
+        nonlocal sent
+        while True:
+            number = sent
+            sent += 1
+
+            if args.rate:
+                scheduled = started + number / args.rate
+                if scheduled >= deadline:
+                    return
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= deadline:
+                    return
+
+            use_nmt = rng.random() < args.nmt_ratio
+            batch = rng.random() < args.batch_ratio
+            texts = [rng.choice(TEST_CASES) for _ in range(args.batch_size if batch else 1)]
+            if args.unique:
+                # A number makes every text new to the server's cache
+                texts = [f"{text} {number}-{i}" for i, text in enumerate(texts)]
+
+            try:
+                status, ok, engine = await send_load_request(client, texts, use_nmt, batch)
+            except httpx.HTTPError as e:
+                status, ok, engine = type(e).__name__, False, None
+
+            finished = time.perf_counter()
+            records.append({
+                "latency": finished - scheduled,
+                "kind": ("batch" if batch else "translate") + (" (use_nmt)" if use_nmt else " (rule-based)"),
+                "texts": len(texts),
+                "status": status,
+                "ok": ok,
+                "engine": engine
+            })
+
+    mode = f"{args.rate:g} req/s" if args.rate else "as fast as possible"
+    print(f"Load test against {args.url}: {args.concurrency} workers, {mode}, {args.duration:g}s, "
+          f"{args.nmt_ratio:.0%} use_nmt, {args.batch_ratio:.0%} batches of {args.batch_size}")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        progress = asyncio.create_task(report_progress(records, started, args.interval))
+        try:
+            await asyncio.gather(*[worker(client) for _ in range(args.concurrency)])
+        finally:
+            progress.cancel()
+
+    elapsed = time.perf_counter() - started
+    print_load_summary(records, elapsed)
+
+def print_load_summary(records, elapsed):
+    """Print totals for the whole load test, by request kind and by engine"""
+    if not records:
+        print("\nNo requests completed")
+        return
+
+    errors = [record for record in records if not record["ok"]]
+    texts = sum(record["texts"] for record in records)
+
+    print("\n" + "=" * 50)
+    print("LOAD TEST RESULTS")
+    print("=" * 50)
+    print(f"Requests: {len(records)} in {elapsed:.1f}s ({len(records) / elapsed:.1f} req/s, {texts / elapsed:.1f} texts/s)")
+    print(f"Errors: {len(errors)} ({len(errors) / len(records):.1%})")
+    print(f"Latency: {latency_summary(records)}")
+
+    print("\nBy request:")
+    for kind in sorted({record["kind"] for record in records}):
+        group = [record for record in records if record["kind"] == kind]
+        failed = sum(1 for record in group if not record["ok"])
+        print(f"  {kind:26}{len(group):>7}   errors {failed / len(group):>6.1%}   {latency_summary(group)}")
+
+    print("\nAnswered by:")
+    for engine in sorted({str(record["engine"]) for record in records}):
+        group = [record for record in records if str(record["engine"]) == engine]
+        print(f"  {engine:26}{len(group):>7}   {latency_summary(group)}")
+
+    if errors:
+        statuses = {}
+        for record in errors:
+            statuses[str(record["status"])] = statuses.get(str(record["status"]), 0) + 1
+        print("\nFailures by status: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
 
 def parse_arguments():
     """Parse command line arguments"""
@@ -91,15 +328,40 @@ def parse_arguments():
     parser.add_argument('--rule-based', action='store_true', help='Force rule-based translation')
     parser.add_argument('--nmt', action='store_true', help='Force NMT translation')
     parser.add_argument('--both', action='store_true', help='Test with both models')
+    parser.add_argument('--url', type=str, default=BASE_URL, help='Base URL of the server')
+    parser.add_argument('--check-routing', action='store_true',
+                        help='Only check that sentences with untranslated words go to NMT; exits 1 on failure')
+    parser.add_argument('--check-sessions', action='store_true',
+                        help='Only check that closing a running session answers it with 410; exits 1 on failure')
+    
+    # Load test mode
+    parser.add_argument('--load', action='store_true', help='Run a concurrent load test instead of the test suite')
+    parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once')
+    parser.add_argument('--rate', type=float, default=0, help='Requests started per second (0: as fast as possible)')
+    parser.add_argument('--duration', type=float, default=30, help='Length of the load test in seconds')
+    parser.add_argument('--nmt-ratio', type=float, default=0.5, help='Share of requests with use_nmt set')
+    parser.add_argument('--batch-ratio', type=float, default=0.0, help='Share of requests sent to the batch endpoint')
+    parser.add_argument('--batch-size', type=int, default=8, help='Texts per batch request')
+    parser.add_argument('--unique', action='store_true', help='Make every text unique so the cache cannot answer')
+    parser.add_argument('--interval', type=float, default=5, help='Seconds between progress reports')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for choosing texts and request kinds')
     
     return parser.parse_args()
 
 if __name__ == "__main__":
     # Parse command line arguments
     args = parse_arguments()
+    BASE_URL = args.url
     
+    if args.load:
+        asyncio.run(run_load_test(args))
+    elif args.check_routing:
+        sys.exit(0 if check_routing() else 1)
+    elif args.check_sessions:
+        sys.exit(0 if check_session_close() else 1)
     # If specific text is provided, just translate that
-    if args.text:
+    elif args.text:
         if args.rule_based:
             test_translation(args.text, use_nmt=False)
         elif args.nmt: